@@ -0,0 +1,123 @@
+"""
+Measures the throughput and memory of the streaming ZIP export of a library.
+
+Builds libraries of increasing sizes in a scratch database, whose generations point to
+a pool of random (incompressible, like PNGs) images in a local storage. Each library is
+exported with `lauzhack_pictorial.export.export_library` to a file, then checked with
+`zipfile`. The peak of memory allocated during the export, measured by `tracemalloc`,
+is compared with building the same archive in memory, which grows with the library.
+
+Usage:
+    python benchmarks/bench_export.py [--sizes 100 1000] [--image-size 262144]
+"""
+
+import argparse
+import asyncio
+import sqlite3
+import io
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from pathlib import Path
+
+from benchmarks.bench_scale import create_schema
+from lauzhack_pictorial.db import Repository, connect, queries
+from lauzhack_pictorial.export import MANIFEST_NAME, export_library
+from lauzhack_pictorial.storage import LocalStorage
+
+# Distinct image files the generations point to.
+POOL = 32
+
+
+def make_library(directory: Path, generations: int, image_size: int) -> Path:
+    path = directory / f"library-{generations}.db"
+    conn = sqlite3.connect(path)
+    create_schema(conn)
+    conn.execute("insert into users (email, password) values ('user@example.com', 1)")
+    conn.executemany(
+        "insert into generations (user_id, image_id, prompt) values (1, ?, ?)",
+        ((f"image-{i % POOL}", f"prompt {i}") for i in range(generations)),
+    )
+    conn.commit()
+    conn.close()
+
+    for i in range(POOL):
+        image = directory / f"image-{i}.png"
+        if not image.exists():
+            image.write_bytes(random.randbytes(image_size))
+    return path
+
+
+async def export_to_file(
+    repository: Repository, storage: LocalStorage, output: Path
+) -> int:
+    size = 0
+    with output.open("wb") as file:
+        async for part in export_library(repository, storage, user_id=1):
+            file.write(part)
+            size += len(part)
+    return size
+
+
+async def export_in_memory(repository: Repository, storage: LocalStorage) -> int:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for generation in await repository.get_user_generations(1):
+            data = b"".join(
+                [chunk async for chunk in storage.read(generation.image_id)]
+            )
+            archive.writestr(f"images/{generation.id}.png", data)
+    return len(buffer.getvalue())
+
+
+async def measure(fn) -> tuple[int, float, int]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = await fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, elapsed, peak
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--image-size", type=int, default=256 * 1024)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        storage = LocalStorage(directory)
+        output = directory / "export.zip"
+
+        print(f"{'images':>7} {'path':<10} {'MB':>8} {'MB/s':>8} {'peak MiB':>9}")
+        for generations in args.sizes:
+            conn = await connect(
+                str(make_library(directory, generations, args.image_size))
+            )
+            repository = Repository(conn, queries, writer=None)
+            candidates = {
+                "streaming": lambda: export_to_file(repository, storage, output),
+                "in memory": lambda: export_in_memory(repository, storage),
+            }
+            for name, fn in candidates.items():
+                size, elapsed, peak = await measure(fn)
+                print(
+                    f"{generations:>7} {name:<10} {size / 1e6:>8.1f}"
+                    f" {size / 1e6 / elapsed:>8.1f} {peak / 2**20:>9.2f}"
+                )
+            await conn.close()
+
+            with zipfile.ZipFile(output) as archive:
+                assert archive.testzip() is None, "corrupted archive"
+                names = archive.namelist()
+                assert len(names) == generations + 1 and names[-1] == MANIFEST_NAME
+            os.remove(output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
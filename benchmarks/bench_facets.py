@@ -0,0 +1,103 @@
+"""
+Measures the latency of faceted filtering of the clients table, keystroke by keystroke.
+
+Replays a session of filter changes (typing a name, ticking cities and an age range,
+sorting, unticking) and times each step, counts of every facet included:
+
+- a scan of a list of dicts, as the page did before: every step filters all the rows
+  in Python and counts the facet values of the rows matching the other filters;
+- `htmx_tutorial.clients.ClientTable`, with empty caches, at increasing sizes. The
+  time to build the table (bitmaps and sort orders) is reported apart.
+
+Usage:
+    python benchmarks/bench_facets.py [--sizes 100000 1000000 3000000]
+"""
+
+import argparse
+import time
+from collections import Counter
+from dataclasses import asdict
+
+from htmx_tutorial.clients import AGE_BINS, AGE_RANGES, ClientTable
+
+SCAN_SIZE = 100_000
+
+
+def session(table: ClientTable) -> list[tuple[str, dict, str]]:
+    """The successive (filter, selected values, sort) of the replayed session."""
+    city, other_city = table.facets["city"].labels[:2]
+    steps = [(text, {}, "none") for text in ("j", "jo", "joh")]
+    steps += [
+        ("joh", {"city": [city]}, "none"),
+        ("joh", {"city": [city, other_city]}, "none"),
+        ("joh", {"city": [city, other_city], "age": ["25-34"]}, "none"),
+        ("joh", {"city": [city, other_city], "age": ["25-34"]}, "name"),
+        ("joh", {"city": [other_city], "age": ["25-34"]}, "name"),
+        ("", {"city": [other_city], "age": ["25-34"]}, "name"),
+    ]
+    return steps
+
+
+def age_range(age: int) -> str:
+    return AGE_RANGES[sum(age >= bound for bound in AGE_BINS)]
+
+
+def scan(rows: list[dict], text: str, selected: dict, sort: str) -> tuple:
+    def matches(row: dict, skip: str = "") -> bool:
+        return text in row["name"].lower() and all(
+            row[facet] in values
+            for facet, values in selected.items()
+            if values and facet != skip
+        )
+
+    data = [row for row in rows if matches(row)]
+    if sort != "none":
+        data = sorted(data, key=lambda row: row[sort])
+    counts = {
+        facet: Counter(row[facet] for row in rows if matches(row, skip=facet))
+        for facet in ("city", "country", "age")
+    }
+    return data[:100], counts
+
+
+def report(name: str, size: int, timings: list[float]) -> None:
+    mean = sum(timings) / len(timings) * 1000
+    print(f"{name:<12} {size:>9,} {mean:>10.1f} {max(timings) * 1000:>10.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100_000, 1_000_000, 3_000_000]
+    )
+    args = parser.parse_args()
+
+    print(f"{'path':<12} {'clients':>9} {'mean ms':>10} {'max ms':>10}")
+
+    table = ClientTable(size=SCAN_SIZE, seed=0)
+    rows = []
+    for row in range(SCAN_SIZE):
+        client = table.client(row)
+        # The age facet filters on the range of the age
+        rows.append({**asdict(client), "age": age_range(client.age)})
+    timings = []
+    for text, selected, sort in session(table):
+        start = time.perf_counter()
+        scan(rows, text, selected, sort)
+        timings.append(time.perf_counter() - start)
+    report("list scan", SCAN_SIZE, timings)
+
+    for size in args.sizes:
+        start = time.perf_counter()
+        table = ClientTable(size=size, seed=0)
+        print(f"built {size:,} clients in {time.perf_counter() - start:.1f}s")
+        timings = []
+        for text, selected, sort in session(table):
+            start = time.perf_counter()
+            table.search(text, selected, sort)
+            timings.append(time.perf_counter() - start)
+        report("bitmaps", size, timings)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Compares write throughput with a commit per insert and with group commit.
+
+For each concurrency level, that many coroutines insert generations as fast as
+they can into a scratch database opened like the application's, either
+committing after every insert (the former Repository behavior) or through a
+`GroupCommitter`.
+
+Usage:
+    python benchmarks/bench_group_commit.py [--writes 2000]
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from lauzhack_pictorial.db import GroupCommitter, connect, queries
+
+SCHEMA = Path(__file__).parent.parent / "db" / "schema.sql"
+
+
+async def commit_each(conn, writes: int, concurrency: int) -> None:
+    async def writer(count: int):
+        for i in range(count):
+            await queries.create_generation(conn, 1, f"{i}", "a red cat")
+            await conn.commit()
+
+    await asyncio.gather(*(writer(writes // concurrency) for _ in range(concurrency)))
+
+
+async def group_commit(conn, writes: int, concurrency: int) -> None:
+    committer = GroupCommitter(conn)
+    committer.start()
+
+    async def writer(count: int):
+        for i in range(count):
+            await committer.submit(queries.create_generation, 1, f"{i}", "a red cat")
+
+    await asyncio.gather(*(writer(writes // concurrency) for _ in range(concurrency)))
+    await committer.stop()
+
+
+async def measure(strategy, writes: int, concurrency: int) -> float:
+    with tempfile.TemporaryDirectory() as directory:
+        conn = await connect(str(Path(directory) / "bench.sqlite3"))
+        await conn.executescript(SCHEMA.read_text())
+        await conn.execute("insert into users (email, password) values ('a', 'b')")
+        await conn.commit()
+
+        start = time.perf_counter()
+        await strategy(conn, writes, concurrency)
+        elapsed = time.perf_counter() - start
+
+        await conn.close()
+    return writes / elapsed
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--writes", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'concurrency':>11} {'commit each':>12} {'group commit':>13}  (writes/s)")
+    for concurrency in (1, 8, 64, 256):
+        each = await measure(commit_each, args.writes, concurrency)
+        group = await measure(group_commit, args.writes, concurrency)
+        print(f"{concurrency:>11} {each:>12.0f} {group:>13.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
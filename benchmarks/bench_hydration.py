@@ -0,0 +1,68 @@
+"""
+Measures the cost of turning database rows into models, per 10k rows.
+
+Compares the former pydantic path (`Model(**row)`, full validation of every row)
+with the slotted dataclasses of `lauzhack_pictorial.db.models` built positionally
+from the row tuples, on rows fetched from an in-memory SQLite database.
+
+Usage:
+    python benchmarks/bench_hydration.py [--rows 10000] [--repeat 20]
+"""
+
+import argparse
+import sqlite3
+import timeit
+from itertools import starmap
+
+from pydantic import BaseModel
+
+from lauzhack_pictorial.db.models import Generation
+
+
+class PydanticGeneration(BaseModel):
+    id: int
+    user_id: int
+    image_id: str
+    prompt: str
+
+
+def fetch_rows(count: int) -> list[sqlite3.Row]:
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute(
+        "create table generations("
+        "id integer primary key, user_id int, image_id text, prompt text)"
+    )
+    conn.executemany(
+        "insert into generations(user_id, image_id, prompt) values (?, ?, ?)",
+        (
+            (i % 100, f"{i:032x}", f"a photo of a red cat number {i}")
+            for i in range(count)
+        ),
+    )
+    return conn.execute(
+        "select id, user_id, image_id, prompt from generations"
+    ).fetchall()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = fetch_rows(args.rows)
+    candidates = {
+        "pydantic Model(**row)": lambda: [PydanticGeneration(**row) for row in rows],
+        "dataclass starmap(row)": lambda: list(starmap(Generation, rows)),
+    }
+
+    scale = 10_000 / args.rows
+    print(f"{'hydration':<24} {'ms / 10k rows':>14}")
+    for name, fn in candidates.items():
+        best = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+        print(f"{name:<24} {best * 1000 * scale:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
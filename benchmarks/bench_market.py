@@ -0,0 +1,58 @@
+"""
+Measures the cost of a live-data update.
+
+Compares the former path (a new `faker.Faker()` and one random company per
+request) with the vectorized `htmx_tutorial.market.MarketEngine`: one tick of the
+whole universe, then the diff of a subscription against the previous tick.
+
+Usage:
+    python benchmarks/bench_market.py [--repeat 200]
+"""
+
+import argparse
+import timeit
+
+import faker
+import numpy as np
+
+from htmx_tutorial.market import MarketEngine
+
+
+def faker_update() -> dict:
+    fake = faker.Faker()
+    return {
+        "name": fake.company(),
+        "price": fake.pyfloat(left_digits=4, right_digits=2, positive=True),
+        "change": fake.pyfloat(left_digits=2, right_digits=2, positive=True),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'update':<42} {'rows':>6} {'us':>10}")
+    best = min(timeit.repeat(faker_update, number=1, repeat=args.repeat))
+    print(f"{'Faker() + 1 random company':<42} {1:>6} {best * 1e6:>10.0f}")
+
+    for size, subscribed in ((5_000, 20), (5_000, 1_000), (50_000, 1_000)):
+        market = MarketEngine(size=size, seed=0)
+        indexes = np.arange(subscribed)
+        now = market.updated
+        rows = []
+
+        def update():
+            nonlocal now, rows
+            now += market.tick_seconds
+            since = market.tick
+            market.advance(now)
+            rows = market.quotes(indexes, since)
+
+        best = min(timeit.repeat(update, number=1, repeat=args.repeat))
+        name = f"tick {size} tickers, diff {subscribed} watched"
+        print(f"{name:<42} {len(rows):>6} {best * 1e6:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
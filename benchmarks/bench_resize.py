@@ -0,0 +1,65 @@
+"""
+Measures the cost of producing several sizes and formats of an uploaded image.
+
+Compares one request per size (the former behaviour: decode the full image, resize
+it from the original and encode it, for every size) with the single-decode path of
+`htmx_tutorial.form_submission_router.render_variants`, which decodes once (at a
+reduced scale for JPEG when every size is smaller than the original) and downscales
+each size from the previous one.
+
+Usage:
+    python benchmarks/bench_resize.py [--width 4000] [--repeat 5]
+"""
+
+import argparse
+import io
+import timeit
+
+from PIL import Image
+
+from htmx_tutorial.form_submission_router import FORMATS, render_variants
+
+PERCENTAGES = [50, 25, 10]
+
+
+def make_jpeg(width: int) -> bytes:
+    height = width * 3 // 4
+    image = Image.effect_mandelbrot((width, height), (-2, -1.5, 1, 1.5), 100)
+    buffered = io.BytesIO()
+    image.convert("RGB").save(buffered, format="JPEG", quality=90)
+    return buffered.getvalue()
+
+
+def one_request_per_size(source: bytes, formats: list[str]) -> None:
+    for percentage in PERCENTAGES:
+        image = Image.open(io.BytesIO(source))
+        size = tuple(x * percentage // 100 for x in image.size)
+        resized = image.resize(size, Image.LANCZOS)
+        for name in formats:
+            resized.save(io.BytesIO(), format=FORMATS[name][0], quality=85)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=4000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    source = make_jpeg(args.width)
+    sizes = ", ".join(f"{p}%" for p in PERCENTAGES)
+    print(f"{args.width}px JPEG ({len(source) // 1024} KiB) to {sizes}")
+    print(f"{'path':<28} {'formats':<16} {'ms':>8}")
+    for formats in (["jpeg"], ["jpeg", "webp", "png"]):
+        candidates = {
+            "one decode per size": lambda: one_request_per_size(source, formats),
+            "single decode": lambda: render_variants(
+                io.BytesIO(source), PERCENTAGES, formats
+            ),
+        }
+        for name, fn in candidates.items():
+            best = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+            print(f"{name:<28} {','.join(formats):<16} {best * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+"""
+Scale test of the SQL queries of `lauzhack_pictorial/db/queries.sql`.
+
+Builds a scratch database from the dbmate migrations and bulk-loads it with synthetic
+users and generations, with batched `executemany` calls inside a single transaction.
+Generations are skewed towards a few heavy users, as in real libraries. Then, for
+every query loaded by aiosql:
+
+- its `EXPLAIN QUERY PLAN` is checked: a scan of a whole table or index fails the
+  check, unless the query is listed in ALLOWED_SCANS with a reason;
+- it is run through aiosql and aiosqlite, as the application does, with random
+  parameters, and its latency percentiles are recorded. Writes are rolled back. A
+  p50 or p95 above the query's entry in LATENCY_BUDGETS fails the check.
+
+A query without parameters in `sample_params`, or without a latency budget, fails the
+check too, so that new queries get covered. Exits with status 1 when any check fails.
+
+The budgets hold at the default scale on a laptop with the database in the page
+cache; --slack multiplies them on slower machines.
+
+Usage:
+    python benchmarks/bench_scale.py [--users 1000000] [--generations 3000000]
+                                     [--samples 200] [--slack 1.0] [--db PATH]
+                                     [--keep]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+from itertools import islice
+from pathlib import Path
+from statistics import quantiles
+
+from lauzhack_pictorial.db import (
+    connect,
+    fts_user_query,
+    prompt_has_prefixes,
+    queries,
+)
+
+MIGRATIONS = Path(__file__).parent.parent / "db" / "migrations"
+
+# Queries allowed to scan a whole table, and why.
+ALLOWED_SCANS = {
+    "get_users": "lists every user by design, not called by any route",
+}
+
+# p50 and p95 latency budgets of every query, in milliseconds, through aiosqlite.
+# Queries allowed to scan are only timed a few times and have no budget.
+LATENCY_BUDGETS = {
+    "create_user": (1, 10),
+    "get_user_by_credentials": (1, 10),
+    "get_user_by_id": (1, 5),
+    "create_generation": (1, 10),
+    "create_generations": (2, 20),
+    # A whole library: tens of thousands of rows for the heaviest users.
+    "get_user_generations": (2, 50),
+    "get_user_generations_page": (1, 10),
+    "get_user_generation_by_image_id": (1, 10),
+    "search_user_generations": (2, 10),
+    "create_batch": (1, 10),
+    "claim_batch": (1, 10),
+    "delete_expired_batches": (1, 10),
+}
+
+WORDS = (
+    "red blue green golden silver dark bright misty ancient futuristic tiny giant "
+    "cat dog fox owl dragon robot castle forest ocean mountain city desert river "
+    "portrait landscape painting photo sketch watercolor render neon sunset night "
+    "winter summer rain snow space planet garden village bridge tower ship train"
+).split()
+
+# A table or index scanned from end to end. Virtual tables (FTS5) are fine as long
+# as a constraint, e.g. MATCH, is pushed down to them (non-empty index string).
+SCAN_PATTERN = re.compile(r"^SCAN (\S+)(?: VIRTUAL TABLE INDEX \d+:(\S*))?")
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def create_schema(conn: sqlite3.Connection) -> None:
+    """Apply the 'up' part of every dbmate migration, in order."""
+    for path in sorted(MIGRATIONS.glob("*.sql")):
+        up = path.read_text().split("-- migrate:up")[1].split("-- migrate:down")[0]
+        conn.executescript(up)
+
+
+def prompt(rng: random.Random) -> str:
+    return " ".join(rng.choices(WORDS, k=6))
+
+
+def load(path: Path, users: int, generations: int, batch: int, seed: int) -> None:
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path, isolation_level=None)
+    # A scratch database: durability does not matter, loading speed does.
+    conn.execute("pragma journal_mode = off")
+    conn.execute("pragma synchronous = off")
+    conn.execute("pragma cache_size = -262144")
+    create_schema(conn)
+
+    start = time.perf_counter()
+    conn.execute("begin")
+    # Indexing the prompts row by row through the trigger is ~10x slower than
+    # rebuilding the full-text index once at the end.
+    (trigger,) = conn.execute(
+        "select sql from sqlite_master where name = 'generations_fts_insert'"
+    ).fetchone()
+    conn.execute("drop trigger generations_fts_insert")
+    rows = ((f"user{i}@example.com", rng.getrandbits(31)) for i in range(users))
+    for chunk in batched(rows, batch):
+        conn.executemany("insert into users (email, password) values (?, ?)", chunk)
+    # Skewed towards the first users: user 1 owns about 1% of the generations.
+    rows = (
+        (
+            int(users * rng.random() ** 3) + 1,
+            f"{rng.getrandbits(128):032x}",
+            prompt(rng),
+        )
+        for _ in range(generations)
+    )
+    for chunk in batched(rows, batch):
+        conn.executemany(
+            "insert into generations (user_id, image_id, prompt) values (?, ?, ?)",
+            chunk,
+        )
+    conn.execute("insert into generations_fts(generations_fts) values ('rebuild')")
+    conn.execute("insert into generations_fts(generations_fts) values ('optimize')")
+    conn.execute(trigger)
+    conn.execute("commit")
+    elapsed = time.perf_counter() - start
+    print(
+        f"loaded {users} users and {generations} generations in {elapsed:.1f}s "
+        f"({(users + generations) / elapsed:,.0f} rows/s)"
+    )
+    conn.close()
+
+
+def sample_params(conn: sqlite3.Connection, users: int, rng: random.Random) -> dict:
+    """Parameter factories of every query, drawn from the loaded data."""
+    max_generation = conn.execute("select max(id) from generations").fetchone()[0]
+
+    def active_user() -> int:
+        # The owner of a random generation: heavy users are picked more often.
+        row = conn.execute(
+            "select user_id from generations where id = ?",
+            (rng.randint(1, max_generation),),
+        ).fetchone()
+        return row[0] if row else 1
+
+    def existing_user() -> dict:
+        user_id = rng.randint(1, users)
+        email, password = conn.execute(
+            "select email, password from users where id = ?", (user_id,)
+        ).fetchone()
+        return {"email": email, "password": password}
+
+    def owned_image() -> dict:
+        user_id, image_id = conn.execute(
+            "select user_id, image_id from generations where id = ?",
+            (rng.randint(1, max_generation),),
+        ).fetchone()
+        return {"user_id": user_id, "image_id": image_id}
+
+    def search() -> dict:
+        user_id = active_user()
+        word = rng.choice(WORDS)
+        match, long_words = fts_user_query(user_id, word[: rng.randint(2, len(word))])
+        return {
+            "user_id": user_id,
+            "query": match,
+            "words": json.dumps(long_words),
+            "limit": 24,
+            "offset": 0,
+        }
+
+    def generation() -> dict:
+        return {
+            "user_id": active_user(),
+            "image_id": f"{rng.getrandbits(128):032x}",
+            "prompt": prompt(rng),
+        }
+
+    return {
+        "get_users": lambda: {},
+        "create_user": lambda: {
+            "email": f"new{rng.getrandbits(64)}@example.com",
+            "password": rng.getrandbits(31),
+        },
+        "get_user_by_credentials": existing_user,
+        "get_user_by_id": lambda: {"id": rng.randint(1, users)},
+        "create_generation": generation,
+        "create_generations": lambda: [generation() for _ in range(4)],
+        "get_user_generations": lambda: {"user_id": active_user()},
+        "get_user_generations_page": lambda: {
+            "user_id": active_user(),
+            "after": rng.randint(0, max_generation),
+            "limit": 500,
+        },
+        "get_user_generation_by_image_id": owned_image,
+        "search_user_generations": search,
+        "create_batch": lambda: {
+            "id": f"{rng.getrandbits(128):032x}",
+            "user_id": active_user(),
+            "size": "1024x1024",
+            "prompts": json.dumps([prompt(rng)]),
+            "created_at": time.time(),
+        },
+        "claim_batch": lambda: {
+            "id": f"{rng.getrandbits(128):032x}",
+            "user_id": active_user(),
+            "since": time.time() - 300,
+        },
+        "delete_expired_batches": lambda: {"before": time.time() - 300},
+    }
+
+
+def query_plan(conn: sqlite3.Connection, sql: str, params) -> list[str]:
+    if isinstance(params, list):
+        params = params[0]
+    rows = conn.execute(f"explain query plan {sql}", params).fetchall()
+    return [detail for *_, detail in rows]
+
+
+def full_scans(plan: list[str]) -> list[str]:
+    scans = []
+    for detail in plan:
+        match = SCAN_PATTERN.match(detail)
+        if match and not match.group(2):
+            scans.append(detail)
+    return scans
+
+
+async def time_query(path: Path, name: str, make_params, samples: int) -> list[float]:
+    conn = await connect(str(path))
+    fn = getattr(queries, name)
+    latencies = []
+    try:
+        for _ in range(samples):
+            params = make_params()
+            start = time.perf_counter()
+            if isinstance(params, list):
+                await fn(conn, params)
+            else:
+                await fn(conn, **params)
+            latencies.append(time.perf_counter() - start)
+        await conn.rollback()
+    finally:
+        await conn.close()
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--generations", type=int, default=3_000_000)
+    parser.add_argument("--batch", type=int, default=50_000)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument(
+        "--slack", type=float, default=1.0, help="multiply the latency budgets"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--db", type=Path, default=Path(tempfile.gettempdir()) / "pictorial-scale.db"
+    )
+    parser.add_argument(
+        "--keep", action="store_true", help="keep the database and reuse it next time"
+    )
+    args = parser.parse_args()
+
+    if not (args.keep and args.db.exists()):
+        args.db.unlink(missing_ok=True)
+        load(args.db, args.users, args.generations, args.batch, args.seed)
+
+    rng = random.Random(args.seed)
+    conn = sqlite3.connect(args.db)
+    # The SQL functions registered by `connect`, to explain the queries using them.
+    conn.create_function(
+        "prompt_has_prefixes", 2, prompt_has_prefixes, deterministic=True
+    )
+    users = conn.execute("select count(*) from users").fetchone()[0]
+    params = sample_params(conn, users, rng)
+    names = [q for q in queries.available_queries if not q.endswith("_cursor")]
+
+    failures = []
+    print(
+        f"\n{'query':<32} {'plan':<6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+        f" {'budget':>9}"
+    )
+    for name in names:
+        if name not in params:
+            failures.append(f"{name}: no parameters in sample_params(), add them")
+            continue
+        budget = LATENCY_BUDGETS.get(name)
+        if budget is None and name not in ALLOWED_SCANS:
+            failures.append(f"{name}: no latency budget in LATENCY_BUDGETS, add one")
+
+        plan = query_plan(conn, getattr(queries, name).sql, params[name]())
+        scans = full_scans(plan)
+        if scans and name not in ALLOWED_SCANS:
+            failures.append(f"{name}: full scan\n    " + "\n    ".join(plan))
+        status = "scan" if scans else "ok"
+
+        samples = args.samples if name not in ALLOWED_SCANS else min(5, args.samples)
+        latencies = asyncio.run(time_query(args.db, name, params[name], samples))
+        p50, p95, p99 = (
+            (quantiles(latencies, n=100)[i] * 1000 for i in (49, 94, 98))
+            if len(latencies) > 1
+            else (latencies[0] * 1000,) * 3
+        )
+        if budget is None:
+            print(f"{name:<32} {status:<6} {p50:>9.2f} {p95:>9.2f} {p99:>9.2f}")
+            continue
+        max_p50, max_p95 = (limit * args.slack for limit in budget)
+        over = p50 > max_p50 or p95 > max_p95
+        print(
+            f"{name:<32} {status:<6} {p50:>9.2f} {p95:>9.2f} {p99:>9.2f}"
+            f" {f'{max_p50:g}/{max_p95:g}':>9}{'  OVER' if over else ''}"
+        )
+        if over:
+            failures.append(
+                f"{name}: p50 {p50:.2f} ms, p95 {p95:.2f} ms"
+                f" > budget {max_p50:g} ms, {max_p95:g} ms"
+            )
+    conn.close()
+
+    for name, reason in ALLOWED_SCANS.items():
+        print(f"\nallowed scan: {name} ({reason})")
+    if not args.keep:
+        args.db.unlink(missing_ok=True)
+
+    if failures:
+        print("\nFAILED:\n" + "\n".join(failures))
+        sys.exit(1)
+    print("\nall query plans and latencies OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Measures the latency of the library search at millions of generations.
+
+Builds (or reuses, with --keep) the scratch database of `bench_scale.py`, whose
+generations are skewed towards a few heavy users, then runs
+`Repository.search_user_generations` as the search box does, for users with libraries
+of very different sizes and for typed prefixes of increasing length: 2 and 3
+characters, 4 to 6 (all answered from the prefix index), and longer ones (matched on
+their first 6 characters, then checked against the prompts).
+
+Exits with status 1 when the p95 latency of a case exceeds --target-ms.
+
+Usage:
+    python benchmarks/bench_search.py [--users 1000000] [--generations 3000000]
+                                      [--samples 200] [--target-ms 10] [--db PATH]
+                                      [--keep]
+"""
+
+import argparse
+import asyncio
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+from statistics import quantiles
+
+from benchmarks.bench_scale import WORDS, load
+from lauzhack_pictorial.db import FTS_MAX_PREFIX, Repository, connect, queries
+
+PREFIXES = {
+    "2-3": (2, 3),
+    "4-6": (4, FTS_MAX_PREFIX),
+    "7+": (FTS_MAX_PREFIX + 1, max(map(len, WORDS))),
+}
+
+
+def pick_users(path: Path, users: int) -> dict[str, tuple[int, int]]:
+    """A heavy, a median and a light user, with the size of their library."""
+    conn = sqlite3.connect(path)
+    picked = {}
+    for name, user_id in (
+        ("heavy", 1),
+        ("median", users // 1000),
+        ("light", users // 2),
+    ):
+        (count,) = conn.execute(
+            "select count(*) from generations where user_id = ?", (user_id,)
+        ).fetchone()
+        picked[name] = (user_id, count)
+    conn.close()
+    return picked
+
+
+async def time_searches(
+    repository: Repository, user_id: int, lengths: tuple[int, int], samples: int, rng
+) -> list[float]:
+    words = [word for word in WORDS if len(word) >= lengths[0]]
+    latencies = []
+    for _ in range(samples):
+        word = rng.choice(words)
+        text = word[: rng.randint(lengths[0], min(lengths[1], len(word)))]
+        start = time.perf_counter()
+        await repository.search_user_generations(user_id, text, limit=25)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def run(args: argparse.Namespace) -> list[str]:
+    """Time every case on one connection, as the application does."""
+    rng = random.Random(args.seed)
+    conn = await connect(str(args.db))
+    repository = Repository(conn, queries, writer=None)
+    failures = []
+    print(f"\n{'user':<8} {'library':>8} {'prefix':<6} {'p50 ms':>9} {'p95 ms':>9}")
+    try:
+        for name, (user_id, count) in pick_users(args.db, args.users).items():
+            for label, lengths in PREFIXES.items():
+                latencies = await time_searches(
+                    repository, user_id, lengths, args.samples, rng
+                )
+                p50, p95 = (quantiles(latencies, n=100)[i] * 1000 for i in (49, 94))
+                print(f"{name:<8} {count:>8} {label:<6} {p50:>9.2f} {p95:>9.2f}")
+                if p95 > args.target_ms:
+                    failures.append(
+                        f"{name} user, {label} characters: p95 {p95:.2f} ms"
+                        f" > {args.target_ms} ms"
+                    )
+    finally:
+        await conn.close()
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--generations", type=int, default=3_000_000)
+    parser.add_argument("--batch", type=int, default=50_000)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--target-ms", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--db", type=Path, default=Path(tempfile.gettempdir()) / "pictorial-scale.db"
+    )
+    parser.add_argument(
+        "--keep", action="store_true", help="keep the database and reuse it next time"
+    )
+    args = parser.parse_args()
+
+    if not (args.keep and args.db.exists()):
+        args.db.unlink(missing_ok=True)
+        load(args.db, args.users, args.generations, args.batch, args.seed)
+
+    failures = asyncio.run(run(args))
+
+    if not args.keep:
+        args.db.unlink(missing_ok=True)
+
+    if failures:
+        print("\nFAILED:\n" + "\n".join(failures))
+        sys.exit(1)
+    print(f"\nall searches under {args.target_ms} ms at p95")
+
+
+if __name__ == "__main__":
+    main()
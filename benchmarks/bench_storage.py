@@ -0,0 +1,85 @@
+"""
+Round-trips images through `S3Storage` against the local object store stand-in.
+
+Starts `benchmarks/s3_stub.py`, uploads images of typical (2 MB) and large (20 MB,
+multipart) sizes concurrently, downloads them back through their presigned URLs
+and checks the bytes, reporting the upload and download throughput.
+
+Usage:
+    python benchmarks/bench_storage.py [--images 32]
+"""
+
+import argparse
+import asyncio
+import base64
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from lauzhack_pictorial.storage import S3Storage, decode_base64
+
+PORT = 9100
+URL = f"http://127.0.0.1:{PORT}"
+
+
+async def roundtrip(storage: S3Storage, size: int, images: int) -> None:
+    payloads = {f"image-{size}-{i}": os.urandom(size) for i in range(images)}
+    encoded = {key: base64.b64encode(data).decode() for key, data in payloads.items()}
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(storage.save(key, decode_base64(b64)) for key, b64 in encoded.items())
+    )
+    upload = time.perf_counter() - start
+
+    async def download(key: str) -> bytes:
+        return b"".join([chunk async for chunk in storage.read(key)])
+
+    start = time.perf_counter()
+    downloaded = await asyncio.gather(*(download(key) for key in payloads))
+    read = time.perf_counter() - start
+
+    assert downloaded == list(payloads.values()), "corrupted round trip"
+    total = size * images / 1e6
+    print(
+        f"{images:>3} x {size / 1e6:>4.0f} MB"
+        f"  upload {total / upload:>7.1f} MB/s  download {total / read:>7.1f} MB/s"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=int, default=32)
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=64, max_keepalive_connections=16)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        storage = S3Storage(client, URL, "pictorial", "access", "secret")
+        await roundtrip(storage, 2_000_000, args.images)
+        await roundtrip(storage, 20_000_000, max(1, args.images // 8))
+
+
+def wait_until_up() -> None:
+    for _ in range(100):
+        try:
+            httpx.get(f"{URL}/pictorial/missing.png", params={"X-Amz-Signature": "x"})
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError("object store stand-in did not start")
+
+
+if __name__ == "__main__":
+    stub = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.s3_stub:app"]
+        + ["--port", str(PORT), "--log-level", "warning"]
+    )
+    try:
+        wait_until_up()
+        asyncio.run(main())
+    finally:
+        stub.terminate()
+        stub.wait()
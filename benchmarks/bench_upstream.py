@@ -0,0 +1,123 @@
+"""
+Exercises the resilient OpenAI caller against the fault-injecting stub server.
+
+Starts `benchmarks/openai_stub.py`, then runs a series of scenarios (healthy,
+slow tail with and without hedging, flaky, down) through a `ResilientCaller`
+and reports the success rate, latency percentiles and the caller's metrics.
+
+Usage:
+    python benchmarks/bench_upstream.py [--calls 200]
+"""
+
+import argparse
+import asyncio
+import subprocess
+import sys
+import time
+
+import httpx
+from openai import AsyncClient
+
+from lauzhack_pictorial.resilience import (
+    CircuitBreaker,
+    ResilientCaller,
+    UpstreamUnavailable,
+)
+
+PORT = 8766
+URL = f"http://127.0.0.1:{PORT}"
+
+SCENARIOS = {
+    "healthy": ({"latency": 0.05}, {}),
+    "slow tail": ({"latency": 0.05, "slow_rate": 0.04, "slow_latency": 1.0}, {}),
+    "slow tail, hedged": (
+        {"latency": 0.05, "slow_rate": 0.04, "slow_latency": 1.0},
+        {"hedge": True},
+    ),
+    "flaky (30% errors)": ({"latency": 0.05, "error_rate": 0.3}, {"backoff": 0.05}),
+    "down": ({"latency": 0.05, "error_rate": 1.0}, {"backoff": 0.05}),
+}
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+
+async def run(client: AsyncClient, caller: ResilientCaller, calls: int) -> dict:
+    latencies = []
+    ok = 0
+
+    async def one():
+        nonlocal ok
+        start = time.perf_counter()
+        try:
+            await caller.call(
+                client.images.generate, prompt="a red cat", response_format="b64_json"
+            )
+            ok += 1
+        except UpstreamUnavailable:
+            pass
+        latencies.append(time.perf_counter() - start)
+
+    # Sequential waves of 10 concurrent calls, like a handful of active users.
+    for _ in range(calls // 10):
+        await asyncio.gather(*(one() for _ in range(10)))
+
+    return {
+        "success": ok / len(latencies),
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    client = AsyncClient(base_url=f"{URL}/v1", api_key="stub", max_retries=0)
+    async with httpx.AsyncClient() as control:
+        for name, (faults, options) in SCENARIOS.items():
+            await control.post(
+                f"{URL}/faults", json={"slow_rate": 0.0, "error_rate": 0.0, **faults}
+            )
+            caller = ResilientCaller(
+                budget=5.0,
+                attempt_timeout=3.0,
+                hedge_min_samples=10,
+                breaker=CircuitBreaker(reset_timeout=1.0),
+                **options,
+            )
+            result = await run(client, caller, args.calls)
+            m = caller.metrics
+            print(
+                f"{name:<20} success={result['success']:>6.1%}"
+                f" p50={result['p50'] * 1000:>6.0f}ms p99={result['p99'] * 1000:>6.0f}ms"
+                f" attempts={m.attempts} retries={m.retries} hedges={m.hedges}"
+                f" hedge_wins={m.hedge_wins} rejected={m.rejected}"
+                f" breaker={caller.breaker.state}"
+            )
+
+
+def wait_until_up() -> None:
+    for _ in range(100):
+        try:
+            httpx.post(f"{URL}/faults", json={})
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError("stub server did not start")
+
+
+if __name__ == "__main__":
+    stub = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.openai_stub:app"]
+        + ["--port", str(PORT), "--log-level", "warning"]
+    )
+    try:
+        wait_until_up()
+        asyncio.run(main())
+    finally:
+        stub.terminate()
+        stub.wait()
@@ -0,0 +1,111 @@
+"""
+Measures how the production server scales with the number of worker processes.
+
+For each worker count, a `uvicorn --workers N` server is started, hammered with
+concurrent requests on `/health` from several client processes, and stopped. The
+output reports the throughput, the speedup over a single worker and the number of
+distinct worker PIDs that answered.
+
+Usage:
+    python benchmarks/bench_workers.py [--duration 5] [--clients 4]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+HOST = "127.0.0.1"
+PORT = 8765
+URL = f"http://{HOST}:{PORT}/health"
+
+
+async def _hammer(duration: float, concurrency: int) -> tuple[int, set[int]]:
+    count = 0
+    pids = set()
+    deadline = time.perf_counter() + duration
+
+    async with httpx.AsyncClient() as client:
+
+        async def worker():
+            nonlocal count
+            while time.perf_counter() < deadline:
+                r = await client.get(URL)
+                pids.add(r.json()["pid"])
+                count += 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    return count, pids
+
+
+def _client(args: tuple[float, int]) -> tuple[int, set[int]]:
+    return asyncio.run(_hammer(*args))
+
+
+def _wait_until_up(timeout: float = 30.0) -> None:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            httpx.get(URL)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+def run(workers: int, duration: float, clients: int) -> tuple[float, int]:
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "lauzhack_pictorial.app:app",
+            "--host",
+            HOST,
+            "--port",
+            str(PORT),
+            "--workers",
+            str(workers),
+            "--no-access-log",
+            "--log-level",
+            "warning",
+        ]
+    )
+    try:
+        _wait_until_up()
+        with multiprocessing.Pool(clients) as pool:
+            results = pool.map(_client, [(duration, 32)] * clients)
+    finally:
+        server.terminate()
+        server.wait()
+
+    total = sum(count for count, _ in results)
+    pids = set().union(*(p for _, p in results))
+    return total / duration, len(pids)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--clients", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    counts = sorted({1, 2, 4, 8, cpus} & set(range(1, cpus + 1)))
+
+    baseline = None
+    print(f"{'workers':>8} {'req/s':>10} {'speedup':>8} {'pids':>5}")
+    for workers in counts:
+        rps, pids = run(workers, args.duration, args.clients)
+        baseline = baseline or rps
+        print(f"{workers:>8} {rps:>10.0f} {rps / baseline:>7.2f}x {pids:>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+A local stand-in for the OpenAI images API with fault injection.
+
+Serves `POST /v1/images/generations` like the real API, returning a tiny PNG.
+Faults are configured at runtime with `POST /faults`, e.g.
+`{"latency": 0.05, "slow_rate": 0.1, "slow_latency": 1.0, "error_rate": 0.3}`:
+
+- latency: seconds every response takes.
+- slow_rate / slow_latency: share of responses taking `slow_latency` seconds instead.
+- error_rate: share of responses failing with a 500.
+
+Usage:
+    uvicorn benchmarks.openai_stub:app --port 8766
+"""
+
+import asyncio
+import base64
+import random
+import time
+
+from litestar import Litestar, post
+from litestar.exceptions import HTTPException
+
+# A 1x1 transparent PNG.
+PNG = base64.b64encode(
+    bytes.fromhex(
+        "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+        "1f15c4890000000d49444154789c6360000002000001e5270a0c0000000049454e44ae426082"
+    )
+).decode()
+
+faults = {"latency": 0.0, "slow_rate": 0.0, "slow_latency": 0.0, "error_rate": 0.0}
+
+
+@post("/faults", status_code=200)
+async def set_faults(data: dict) -> dict:
+    faults.update(data)
+    return faults
+
+
+@post("/v1/images/generations", status_code=200)
+async def generate(data: dict) -> dict:
+    slow = random.random() < faults["slow_rate"]
+    await asyncio.sleep(faults["slow_latency"] if slow else faults["latency"])
+
+    if random.random() < faults["error_rate"]:
+        raise HTTPException(detail="injected fault", status_code=500)
+
+    return {
+        "created": int(time.time()),
+        "data": [{"b64_json": PNG} for _ in range(data.get("n", 1))],
+    }
+
+
+app = Litestar(route_handlers=[set_faults, generate])
@@ -0,0 +1,82 @@
+"""
+A local, in-memory stand-in for an S3-compatible object store such as MinIO.
+
+Implements the subset used by `S3Storage` with path-style addressing: single PUT,
+multipart uploads (create, upload part, complete, abort) and GET. Requests must
+carry a SigV4 Authorization header or a presigned X-Amz-Signature, but the
+signatures themselves are not verified.
+
+Usage:
+    uvicorn benchmarks.s3_stub:app --port 9000
+"""
+
+import hashlib
+import re
+from uuid import uuid4
+
+from litestar import Litestar, Request, Response, delete, get, post, put
+from litestar.exceptions import HTTPException
+
+objects: dict[str, bytes] = {}
+uploads: dict[str, dict[int, bytes]] = {}
+
+
+def check_signed(request: Request) -> None:
+    signed = (
+        "authorization" in request.headers or "X-Amz-Signature" in request.query_params
+    )
+    if not signed:
+        raise HTTPException(detail="AccessDenied", status_code=403)
+
+
+@put("/{bucket:str}/{key:path}", status_code=200)
+async def put_object(bucket: str, key: str, request: Request) -> Response:
+    check_signed(request)
+    body = await request.body()
+    etag = f'"{hashlib.md5(body).hexdigest()}"'
+
+    upload_id = request.query_params.get("uploadId")
+    if upload_id:
+        uploads[upload_id][int(request.query_params["partNumber"])] = body
+    else:
+        objects[f"{bucket}{key}"] = body
+    return Response(b"", headers={"ETag": etag})
+
+
+@post("/{bucket:str}/{key:path}", status_code=200)
+async def post_object(bucket: str, key: str, request: Request) -> Response:
+    check_signed(request)
+    if "uploads" in request.query_params:
+        upload_id = uuid4().hex
+        uploads[upload_id] = {}
+        xml = (
+            '<InitiateMultipartUploadResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+            f"<Bucket>{bucket}</Bucket><Key>{key}</Key><UploadId>{upload_id}</UploadId>"
+            "</InitiateMultipartUploadResult>"
+        )
+        return Response(xml, media_type="application/xml")
+
+    parts = uploads.pop(request.query_params["uploadId"])
+    numbers = [
+        int(n)
+        for n in re.findall(rb"<PartNumber>(\d+)</PartNumber>", await request.body())
+    ]
+    objects[f"{bucket}{key}"] = b"".join(parts[n] for n in numbers)
+    return Response("<CompleteMultipartUploadResult/>", media_type="application/xml")
+
+
+@delete("/{bucket:str}/{key:path}", status_code=204)
+async def abort_upload(bucket: str, key: str, request: Request) -> None:
+    check_signed(request)
+    uploads.pop(request.query_params.get("uploadId"), None)
+
+
+@get("/{bucket:str}/{key:path}")
+async def get_object(bucket: str, key: str, request: Request) -> Response:
+    check_signed(request)
+    if f"{bucket}{key}" not in objects:
+        raise HTTPException(detail="NoSuchKey", status_code=404)
+    return Response(objects[f"{bucket}{key}"], media_type="image/png")
+
+
+app = Litestar(route_handlers=[put_object, post_object, abort_upload, get_object])
@@ -0,0 +1,27 @@
+-- migrate:up
+CREATE VIRTUAL TABLE generations_fts USING fts5(
+    prompt,
+    content='generations',
+    content_rowid='id'
+);
+
+CREATE TRIGGER generations_fts_insert AFTER INSERT ON generations BEGIN
+    INSERT INTO generations_fts(rowid, prompt) VALUES (new.id, new.prompt);
+END;
+
+CREATE TRIGGER generations_fts_delete AFTER DELETE ON generations BEGIN
+    INSERT INTO generations_fts(generations_fts, rowid, prompt) VALUES ('delete', old.id, old.prompt);
+END;
+
+CREATE TRIGGER generations_fts_update AFTER UPDATE OF prompt ON generations BEGIN
+    INSERT INTO generations_fts(generations_fts, rowid, prompt) VALUES ('delete', old.id, old.prompt);
+    INSERT INTO generations_fts(rowid, prompt) VALUES (new.id, new.prompt);
+END;
+
+INSERT INTO generations_fts(generations_fts) VALUES ('rebuild');
+
+-- migrate:down
+DROP TRIGGER generations_fts_update;
+DROP TRIGGER generations_fts_delete;
+DROP TRIGGER generations_fts_insert;
+DROP TABLE generations_fts;
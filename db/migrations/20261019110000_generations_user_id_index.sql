@@ -0,0 +1,5 @@
+-- migrate:up
+CREATE INDEX generations_user_id ON generations(user_id);
+
+-- migrate:down
+DROP INDEX generations_user_id;
@@ -0,0 +1,64 @@
+-- migrate:up
+DROP TRIGGER generations_fts_update;
+DROP TRIGGER generations_fts_delete;
+DROP TRIGGER generations_fts_insert;
+DROP TABLE generations_fts;
+
+-- The owner of each generation, as a token of its own ('u42'), indexed next to the
+-- prompt so that a search only reads the doclists of the user's generations.
+CREATE VIEW generations_fts_content AS
+SELECT id, prompt, 'u' || user_id AS owner FROM generations;
+
+CREATE VIRTUAL TABLE generations_fts USING fts5(
+    prompt,
+    owner,
+    content='generations_fts_content',
+    content_rowid='id',
+    prefix='2 3 4 5 6'
+);
+
+CREATE TRIGGER generations_fts_insert AFTER INSERT ON generations BEGIN
+    INSERT INTO generations_fts(rowid, prompt, owner) VALUES (new.id, new.prompt, 'u' || new.user_id);
+END;
+
+CREATE TRIGGER generations_fts_delete AFTER DELETE ON generations BEGIN
+    INSERT INTO generations_fts(generations_fts, rowid, prompt, owner) VALUES ('delete', old.id, old.prompt, 'u' || old.user_id);
+END;
+
+CREATE TRIGGER generations_fts_update AFTER UPDATE OF prompt, user_id ON generations BEGIN
+    INSERT INTO generations_fts(generations_fts, rowid, prompt, owner) VALUES ('delete', old.id, old.prompt, 'u' || old.user_id);
+    INSERT INTO generations_fts(rowid, prompt, owner) VALUES (new.id, new.prompt, 'u' || new.user_id);
+END;
+
+INSERT INTO generations_fts(generations_fts) VALUES ('rebuild');
+-- Merge the index into a single b-tree: a search looks up the user's rows in every
+-- segment of the index, and a rebuild of millions of rows leaves a dozen of them.
+INSERT INTO generations_fts(generations_fts) VALUES ('optimize');
+
+-- migrate:down
+DROP TRIGGER generations_fts_update;
+DROP TRIGGER generations_fts_delete;
+DROP TRIGGER generations_fts_insert;
+DROP TABLE generations_fts;
+DROP VIEW generations_fts_content;
+
+CREATE VIRTUAL TABLE generations_fts USING fts5(
+    prompt,
+    content='generations',
+    content_rowid='id'
+);
+
+CREATE TRIGGER generations_fts_insert AFTER INSERT ON generations BEGIN
+    INSERT INTO generations_fts(rowid, prompt) VALUES (new.id, new.prompt);
+END;
+
+CREATE TRIGGER generations_fts_delete AFTER DELETE ON generations BEGIN
+    INSERT INTO generations_fts(generations_fts, rowid, prompt) VALUES ('delete', old.id, old.prompt);
+END;
+
+CREATE TRIGGER generations_fts_update AFTER UPDATE OF prompt ON generations BEGIN
+    INSERT INTO generations_fts(generations_fts, rowid, prompt) VALUES ('delete', old.id, old.prompt);
+    INSERT INTO generations_fts(rowid, prompt) VALUES (new.id, new.prompt);
+END;
+
+INSERT INTO generations_fts(generations_fts) VALUES ('rebuild');
@@ -0,0 +1,15 @@
+-- migrate:up
+CREATE TABLE batches(
+    id TEXT PRIMARY KEY NOT NULL,
+    user_id INT NOT NULL,
+    size TEXT NOT NULL,
+    prompts TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
+
+CREATE INDEX batches_created_at ON batches(created_at);
+
+-- migrate:down
+DROP INDEX batches_created_at;
+DROP TABLE batches;
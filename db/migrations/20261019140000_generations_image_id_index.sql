@@ -0,0 +1,5 @@
+-- migrate:up
+CREATE INDEX generations_image_id ON generations(image_id);
+
+-- migrate:down
+DROP INDEX generations_image_id;
@@ -11,6 +11,47 @@ CREATE TABLE generations(
     prompt TEXT NOT NULL,
     FOREIGN KEY (user_id) REFERENCES users(id)
 );
+CREATE INDEX generations_user_id ON generations(user_id);
+CREATE VIEW generations_fts_content AS
+SELECT id, prompt, 'u' || user_id AS owner FROM generations
+/* generations_fts_content(id,prompt,owner) */;
+CREATE VIRTUAL TABLE generations_fts USING fts5(
+    prompt,
+    owner,
+    content='generations_fts_content',
+    content_rowid='id',
+    prefix='2 3 4 5 6'
+)
+/* generations_fts(prompt,owner) */;
+CREATE TABLE IF NOT EXISTS 'generations_fts_data'(id INTEGER PRIMARY KEY, block BLOB);
+CREATE TABLE IF NOT EXISTS 'generations_fts_idx'(segid, term, pgno, PRIMARY KEY(segid, term)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS 'generations_fts_docsize'(id INTEGER PRIMARY KEY, sz BLOB);
+CREATE TABLE IF NOT EXISTS 'generations_fts_config'(k PRIMARY KEY, v) WITHOUT ROWID;
+CREATE TRIGGER generations_fts_insert AFTER INSERT ON generations BEGIN
+    INSERT INTO generations_fts(rowid, prompt, owner) VALUES (new.id, new.prompt, 'u' || new.user_id);
+END;
+CREATE TRIGGER generations_fts_delete AFTER DELETE ON generations BEGIN
+    INSERT INTO generations_fts(generations_fts, rowid, prompt, owner) VALUES ('delete', old.id, old.prompt, 'u' || old.user_id);
+END;
+CREATE TRIGGER generations_fts_update AFTER UPDATE OF prompt, user_id ON generations BEGIN
+    INSERT INTO generations_fts(generations_fts, rowid, prompt, owner) VALUES ('delete', old.id, old.prompt, 'u' || old.user_id);
+    INSERT INTO generations_fts(rowid, prompt, owner) VALUES (new.id, new.prompt, 'u' || new.user_id);
+END;
+CREATE TABLE batches(
+    id TEXT PRIMARY KEY NOT NULL,
+    user_id INT NOT NULL,
+    size TEXT NOT NULL,
+    prompts TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
+CREATE INDEX batches_created_at ON batches(created_at);
+CREATE INDEX generations_image_id ON generations(image_id);
 -- Dbmate schema migrations
 INSERT INTO "schema_migrations" (version) VALUES
-  ('20231129203600');
+  ('20231129203600'),
+  ('20261019100000'),
+  ('20261019110000'),
+  ('20261019120000'),
+  ('20261019130000'),
+  ('20261019140000');
@@ -1,3 +1,6 @@
+import os
+
+
 def task_server_tutorial_dev():
     return {
         "actions": ["litestar --app htmx_tutorial.app:app run --reload -d"],
@@ -10,12 +13,121 @@ def task_server_dev():
     }
 
 
+def task_server_prod():
+    # One worker per core unless WEB_CONCURRENCY says otherwise
+    workers = os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1)
+    return {
+        "actions": [
+            "uvicorn lauzhack_pictorial.app:app --host 0.0.0.0 --port 8000"
+            f" --workers {workers} --timeout-graceful-shutdown 30 --no-access-log"
+        ],
+    }
+
+
+def task_test():
+    return {
+        "actions": ["python -m pytest -q"],
+    }
+
+
+def task_bench_workers():
+    return {
+        "actions": ["python benchmarks/bench_workers.py"],
+    }
+
+
+def task_bench_hydration():
+    return {
+        "actions": ["python benchmarks/bench_hydration.py"],
+    }
+
+
+def task_bench_group_commit():
+    return {
+        "actions": ["python benchmarks/bench_group_commit.py"],
+    }
+
+
+def task_bench_upstream():
+    return {
+        "actions": ["python benchmarks/bench_upstream.py"],
+    }
+
+
+def task_bench_admission():
+    return {
+        "actions": ["python benchmarks/bench_admission.py"],
+    }
+
+
+def task_bench_storage():
+    return {
+        "actions": ["python benchmarks/bench_storage.py"],
+    }
+
+
+def task_bench_resize():
+    return {
+        "actions": ["python benchmarks/bench_resize.py"],
+    }
+
+
+def task_bench_market():
+    return {
+        "actions": ["python benchmarks/bench_market.py"],
+    }
+
+
+def task_bench_facets():
+    return {
+        "actions": ["python benchmarks/bench_facets.py"],
+    }
+
+
+def task_bench_scale():
+    return {
+        "actions": ["python benchmarks/bench_scale.py"],
+    }
+
+
+def task_bench_export():
+    return {
+        "actions": ["python benchmarks/bench_export.py"],
+    }
+
+
+def task_bench_search():
+    return {
+        "actions": ["python benchmarks/bench_search.py"],
+    }
+
+
+def task_check_query_plans():
+    # A small database is enough to catch the full scans, not to time the queries
+    return {
+        "actions": [
+            "python benchmarks/bench_scale.py --users 10000 --generations 30000"
+            " --samples 20"
+        ],
+    }
+
+
 def task_tailwind_dev():
     return {
         "actions": ["tailwindcss -i input.css -o static/output.css --watch"],
     }
 
 
+def task_static_build():
+    # Minify the CSS, then fingerprint and precompress the assets into dist/
+    return {
+        "actions": [
+            "tailwindcss -i input.css -o static/output.css --minify",
+            "python -m lauzhack_pictorial.assets",
+        ],
+    }
+
+
 def task_dev_tutorial():
     yield {"name": "server", **task_server_tutorial_dev()}
     yield {"name": "tailwind", **task_tailwind_dev()}
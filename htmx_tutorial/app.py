@@ -2,11 +2,21 @@ from pathlib import Path
 
 from litestar import Litestar, get
 from litestar.contrib.jinja import JinjaTemplateEngine
+from litestar.middleware import DefineMiddleware
 from litestar.response import Template
 from litestar.static_files.config import StaticFilesConfig
 from litestar.template.config import TemplateConfig
 
-from .filtering_sorting_router import filtering_sorting_router
+from lauzhack_pictorial.admission import (
+    AdmissionControl,
+    AdmissionControlMiddleware,
+    RouteLimit,
+)
+from lauzhack_pictorial.assets import assets_router, register_template_globals
+from lauzhack_pictorial.compression import compression_config
+from lauzhack_pictorial.logs import RequestLoggingMiddleware, logging_config
+
+from .filtering_sorting_router import clients_provider, filtering_sorting_router
 from .form_submission_router import form_submission_router
 from .live_data_router import live_data_router
 
@@ -18,18 +28,60 @@ async def index_view() -> Template:
     )
 
 
+# Resizing downloads and decodes arbitrary images: bound how many run at once.
+admission = AdmissionControl(
+    [
+        RouteLimit(
+            method="POST",
+            path="/form-submission/resize",
+            user_rate=1,
+            user_burst=5,
+            global_rate=20,
+            global_burst=40,
+            max_concurrency=4,
+            max_queue=8,
+            queue_timeout=5,
+        ),
+    ]
+)
+
+
+@get("/metrics")
+async def metrics_view() -> dict:
+    return {"admission": admission.snapshot()}
+
+
 app = Litestar(
     route_handlers=[
         index_view,
+        metrics_view,
         live_data_router,
         form_submission_router,
         filtering_sorting_router,
+        assets_router,
     ],
+    lifespan=[clients_provider],
     static_files_config=[
         StaticFilesConfig(directories=[Path("static")], path="/static"),
     ],
     template_config=TemplateConfig(
         directory=Path(__file__).parent / "templates",
         engine=JinjaTemplateEngine,
+        engine_callback=register_template_globals,
+    ),
+    compression_config=compression_config(exclude=["^/static", "^/assets"]),
+    middleware=[
+        # Live data is polled every second by every open page
+        DefineMiddleware(
+            RequestLoggingMiddleware, sample_rates={"/live-data/data": 0.05}
+        ),
+        DefineMiddleware(AdmissionControlMiddleware, admission=admission),
+    ],
+    logging_config=logging_config(
+        levels={
+            "/filtering-sorting": "DEBUG",
+            "/static": "WARNING",
+            "/assets": "WARNING",
+        }
     ),
 )
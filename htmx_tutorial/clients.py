@@ -0,0 +1,330 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Collection, Optional
+
+import faker
+import numpy as np
+
+AGE_BINS = [25, 35, 45, 55, 65, 75]
+AGE_RANGES = ["18-24", "25-34", "35-44", "45-54", "55-64", "65-74", "75+"]
+
+# Sortable columns, as offered by the sort select of the page
+SORT_COLUMNS = ("name", "age", "email", "city", "country", "phone")
+
+# Bits set in each byte value, to count the rows of a packed bitmap
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+@dataclass(slots=True)
+class Client:
+    name: str
+    age: int
+    email: str
+    city: str
+    country: str
+    phone: str
+
+
+@dataclass(slots=True)
+class FacetValue:
+    code: int
+    label: str
+    count: int
+    selected: bool
+
+
+@dataclass
+class Facet:
+    """
+    A column of a few distinct values the clients can be filtered on.
+
+    Rows hold the code of their value, an index into `labels`. Each value also has a
+    precomputed bitmap of its rows (one bit per client, packed in 64-bit words), so
+    selecting values is an OR of their bitmaps, and combining facets an AND.
+    """
+
+    name: str
+    title: str
+    labels: list[str]
+    codes: np.ndarray
+    bitmaps: np.ndarray
+    totals: np.ndarray
+
+    @classmethod
+    def build(cls, name: str, title: str, labels: list[str], codes: np.ndarray):
+        bitmaps = np.stack([_pack(codes == code) for code in range(len(labels))])
+        totals = np.bincount(codes, minlength=len(labels))
+        return cls(name, title, labels, codes, bitmaps, totals)
+
+    def code(self, label: str) -> Optional[int]:
+        try:
+            return self.labels.index(label)
+        except ValueError:
+            return None
+
+
+@dataclass
+class SearchResult:
+    total: int
+    clients: list[Client]
+    facets: list[tuple[Facet, list[FacetValue]]]
+
+
+def _pack(mask: np.ndarray) -> np.ndarray:
+    """Pack a boolean row mask into a bitmap of 64-bit words."""
+    packed = np.packbits(mask)
+    padded = np.zeros(-(-packed.size // 8) * 8, dtype=np.uint8)
+    padded[: packed.size] = packed
+    return padded.view(np.uint64)
+
+
+def _and(bitmaps: list[Optional[np.ndarray]]) -> Optional[np.ndarray]:
+    """Intersect bitmaps, where None stands for every row."""
+    bitmaps = [bitmap for bitmap in bitmaps if bitmap is not None]
+    if not bitmaps:
+        return None
+    return np.bitwise_and.reduce(bitmaps) if len(bitmaps) > 1 else bitmaps[0]
+
+
+class ClientTable:
+    """
+    A synthetic table of clients, stored by column, with faceted filtering.
+
+    Names, emails, cities and countries are drawn from small vocabularies made with
+    Faker, so that each column holds codes into its vocabulary rather than millions
+    of strings. Rows are sorted once per column at startup; a page is the first
+    selected rows in that order, and only they are turned into `Client`s.
+
+    A search combines a substring filter on the name with any number of values per
+    facet (city, country, age range): values of a facet are OR-ed, facets AND-ed, all
+    on the bitmaps. The count of every facet value is computed among the rows matching
+    the other facets, so that choosing a city still shows how many clients the other
+    cities would add. Counting uses the codes of those rows (a single `bincount`),
+    which is cheaper than intersecting one bitmap per value for facets with hundreds
+    of values.
+
+    Filter changes are incremental: the bitmaps of a facet selection and of a name
+    filter, and the counts of a facet given the other filters, are cached. Ticking a
+    city reuses the city counts and recomputes the others; typing a letter narrows
+    the names matched by the previous text.
+
+    Searches only read the columns, and the caches are thread-safe, so concurrent
+    searches can run in worker threads.
+    """
+
+    def __init__(
+        self,
+        size: int = 1_000_000,
+        first_names: int = 200,
+        last_names: int = 300,
+        cities: int = 200,
+        countries: int = 40,
+        seed: Optional[int] = None,
+    ):
+        fake = faker.Faker()
+        fake.seed_instance(seed)
+        self.rng = np.random.default_rng(seed)
+        self.size = size
+
+        self.first_names = self._vocabulary(fake.first_name, first_names)
+        self.last_names = self._vocabulary(fake.last_name, last_names)
+        self.domains = self._vocabulary(fake.domain_name, 20)
+        self.cities = self._vocabulary(fake.city, cities)
+        self.countries = self._vocabulary(fake.country, countries)
+        # Codes are drawn within the vocabularies actually built, which are smaller
+        # than requested when Faker runs out of distinct words.
+        # Each city belongs to a country
+        city_country = self.rng.integers(0, len(self.countries), len(self.cities))
+
+        self.first = self.rng.integers(0, len(self.first_names), size).astype(np.int32)
+        self.last = self.rng.integers(0, len(self.last_names), size).astype(np.int32)
+        self.domain = self.rng.integers(0, len(self.domains), size).astype(np.int16)
+        self.age = self.rng.integers(18, 101, size).astype(np.int16)
+        self.phone = self.rng.integers(2_000_000_000, 10_000_000_000, size)
+        # A few big cities hold most clients
+        weights = 1 / np.arange(1, len(self.cities) + 1)
+        city = self.rng.choice(len(self.cities), size, p=weights / weights.sum())
+
+        self.facets = {
+            facet.name: facet
+            for facet in (
+                Facet.build("city", "City", self.cities, city.astype(np.int16)),
+                Facet.build(
+                    "country",
+                    "Country",
+                    self.countries,
+                    city_country[city].astype(np.int16),
+                ),
+                Facet.build("age", "Age", AGE_RANGES, np.digitize(self.age, AGE_BINS)),
+            )
+        }
+
+        # Lower-case "first last" of every pair of names, for the name filter
+        self.full_names = [
+            f"{first} {last}".lower()
+            for first in self.first_names
+            for last in self.last_names
+        ]
+        self.name_code = self.first * len(self.last_names) + self.last
+
+        # The rows sorted by each column, to page through a sorted selection
+        self.orders = {column: self._sort(column) for column in SORT_COLUMNS}
+        self._selection = lru_cache(maxsize=64)(self._selection)
+        self._name_matches = lru_cache(maxsize=256)(self._name_matches)
+        self._name_bitmap = lru_cache(maxsize=16)(self._name_bitmap)
+        self._counts = lru_cache(maxsize=256)(self._counts)
+
+    def _vocabulary(self, make, size: int) -> list[str]:
+        words = set()
+        for _ in range(size * 100):
+            words.add(make())
+            if len(words) == size:
+                break
+        return sorted(words)
+
+    def _selection(self, facet: str, codes: frozenset[int]) -> Optional[np.ndarray]:
+        """The bitmap of the rows having one of the `codes` of `facet`."""
+        if not codes:
+            return None
+        return np.bitwise_or.reduce(self.facets[facet].bitmaps[sorted(codes)])
+
+    def _name_matches(self, text: str) -> np.ndarray:
+        """The codes of the full names containing `text`, narrowed from its prefix."""
+        if not text:
+            return np.arange(len(self.full_names))
+        candidates = self._name_matches(text[:-1])
+        return candidates[[text in self.full_names[i] for i in candidates.tolist()]]
+
+    def _name_bitmap(self, text: str) -> Optional[np.ndarray]:
+        if not text:
+            return None
+        matched = np.zeros(len(self.full_names), dtype=bool)
+        matched[self._name_matches(text)] = True
+        return _pack(matched[self.name_code])
+
+    def _rows(self, bitmap: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        """Unpack a bitmap into a boolean row mask."""
+        if bitmap is None:
+            return None
+        return np.unpackbits(bitmap.view(np.uint8), count=self.size).view(bool)
+
+    def _counts(
+        self, facet: str, text: str, others: tuple[tuple[str, frozenset[int]], ...]
+    ) -> np.ndarray:
+        """The rows of each value of `facet` among those matching the other filters."""
+        rows = self._rows(
+            _and(
+                [self._name_bitmap(text)]
+                + [self._selection(name, codes) for name, codes in others]
+            )
+        )
+        target = self.facets[facet]
+        if rows is None:
+            return target.totals
+        return np.bincount(target.codes[rows], minlength=len(target.labels))
+
+    def _sort(self, column: str) -> np.ndarray:
+        # The vocabularies are sorted: ordering the codes orders the words
+        if column == "name":
+            key = self.name_code
+        elif column == "email":
+            first, last = (
+                np.unique([_email_part(name) for name in names], return_inverse=True)[1]
+                for names in (self.first_names, self.last_names)
+            )
+            pair = first[self.first].astype(np.int64) * len(self.last_names)
+            key = (pair + last[self.last]) * len(self.domains) + self.domain
+        elif column in ("city", "country"):
+            key = self.facets[column].codes
+        else:
+            key = getattr(self, column)
+        # Ties broken by row: unique keys make the quicksort stable, and it is a few
+        # times faster than NumPy's stable sort on large integers
+        key = key.astype(np.int64) * self.size + np.arange(self.size)
+        return np.argsort(key).astype(np.int32)
+
+    def client(self, row: int) -> Client:
+        first = self.first_names[self.first[row]]
+        last = self.last_names[self.last[row]]
+        domain = self.domains[self.domain[row]]
+        phone = str(self.phone[row])
+        return Client(
+            name=f"{first} {last}",
+            age=int(self.age[row]),
+            email=f"{_email_part(first)}.{_email_part(last)}@{domain}",
+            city=self.cities[self.facets["city"].codes[row]],
+            country=self.countries[self.facets["country"].codes[row]],
+            phone=f"({phone[:3]}) {phone[3:6]}-{phone[6:]}",
+        )
+
+    def search(
+        self,
+        text: str = "",
+        selected: Optional[dict[str, Collection[str]]] = None,
+        sort: str = "none",
+        limit: int = 100,
+    ) -> SearchResult:
+        """
+        Return the clients matching a name filter and facet values, with facet counts.
+
+        Args:
+            text (str): Case-insensitive substring of the name.
+            selected (dict[str, Collection[str]]): The labels chosen per facet name.
+            sort (str): One of SORT_COLUMNS, or 'none' to keep the table order.
+            limit (int): Maximum number of clients returned.
+        """
+        text = text.strip().lower()
+        selected = selected or {}
+        selections = {
+            name: frozenset(
+                code
+                for code in map(facet.code, selected.get(name, ()))
+                if code is not None
+            )
+            for name, facet in self.facets.items()
+        }
+
+        bitmap = _and(
+            [self._name_bitmap(text)]
+            + [self._selection(name, codes) for name, codes in selections.items()]
+        )
+        if bitmap is None:
+            total = self.size
+            rows = (
+                self.orders[sort][:limit]
+                if sort in SORT_COLUMNS
+                else np.arange(min(limit, self.size))
+            )
+        else:
+            total = int(_POPCOUNT[bitmap.view(np.uint8)].sum(dtype=np.int64))
+            mask = self._rows(bitmap)
+            if sort in SORT_COLUMNS:
+                order = self.orders[sort]
+                rows = order[mask[order]][:limit]
+            else:
+                rows = np.flatnonzero(mask)[:limit]
+
+        facets = []
+        for name, facet in self.facets.items():
+            others = tuple(
+                (other, codes) for other, codes in selections.items() if other != name
+            )
+            counts = self._counts(name, text, others)
+            facets.append(
+                (
+                    facet,
+                    [
+                        FacetValue(
+                            code, facet.labels[code], count, code in selections[name]
+                        )
+                        for code, count in enumerate(counts.tolist())
+                    ],
+                )
+            )
+
+        return SearchResult(total, [self.client(row) for row in rows.tolist()], facets)
+
+
+def _email_part(name: str) -> str:
+    return re.sub("[^a-z]", "", name.lower())
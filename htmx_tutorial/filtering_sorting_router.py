@@ -1,59 +1,86 @@
-import faker
-from litestar import Controller, Router, get
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Annotated, AsyncGenerator, Optional
+
+from litestar import Controller, Litestar, Router, get
+from litestar.datastructures import State
+from litestar.params import Parameter
 from litestar.response import Template
 
-# Random data for filtering and sorting
-faker = faker.Faker()
-data_filtering_sorting = [
-    {
-        "name": faker.name(),
-        "age": faker.pyint(min_value=18, max_value=100),
-        "email": faker.email(),
-        "city": faker.city(),
-        "country": faker.country(),
-        "phone": faker.phone_number(),
+from .clients import ClientTable, Facet, FacetValue, SearchResult
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 100
+# Values listed per facet besides the selected ones, the most frequent first
+FACET_LIMIT = 10
+
+
+@asynccontextmanager
+async def clients_provider(app: Litestar) -> AsyncGenerator[None, None]:
+    """Build the random clients to filter and sort when the app starts, not on import."""
+    # A million rows take over a second to generate and sort, which delays startup:
+    # keep the event loop free meanwhile
+    app.state.clients = await asyncio.to_thread(ClientTable)
+    yield
+
+
+def visible_values(facet: Facet, values: list[FacetValue]) -> list[FacetValue]:
+    """The values of a facet to list: the selected ones, then the most frequent."""
+    if facet.name == "age":
+        return values
+    values = sorted(values, key=lambda value: -value.count)
+    selected = [value for value in values if value.selected]
+    frequent = [value for value in values if not value.selected and value.count]
+    return selected + frequent[:FACET_LIMIT]
+
+
+def context(result: SearchResult) -> dict:
+    return {
+        "clients": result.clients,
+        "total": result.total,
+        "facets": [
+            (facet, visible_values(facet, values)) for facet, values in result.facets
+        ],
     }
-    for _ in range(100)
-]
 
 
 class FilteringSortingController(Controller):
     path = "/"
 
     @get()
-    async def index_view(self) -> Template:
+    async def index_view(self, state: State) -> Template:
         return Template(
             template_name="filtering-sorting/index.html",
-            context={
-                "clients": data_filtering_sorting,
-            },
+            context=context(
+                await asyncio.to_thread(state.clients.search, limit=PAGE_SIZE)
+            ),
         )
 
     @get("/process")
     async def process(
         self,
-        sort: str,
-        filter: str,
+        state: State,
+        sort: str = "none",
+        filter: Annotated[str, Parameter(max_length=64)] = "",
+        city: Optional[list[str]] = None,
+        country: Optional[list[str]] = None,
+        age: Optional[list[str]] = None,
     ) -> Template:
-        print(filter, sort)
-
-        if filter:
-            data = [
-                client
-                for client in data_filtering_sorting
-                if filter.lower() in client["name"].lower()
-            ]
-        else:
-            data = data_filtering_sorting
-
-        if sort != "none":
-            data = sorted(data, key=lambda x: x[sort])
+        selected = {"city": city or [], "country": country or [], "age": age or []}
+        logger.debug(
+            "filtering clients",
+            extra={"filter": filter, "sort": sort, "selected": selected},
+        )
 
+        # Tens of milliseconds of CPU for a new filter: keep them off the event loop
+        result = await asyncio.to_thread(
+            state.clients.search, filter, selected, sort, PAGE_SIZE
+        )
         return Template(
-            template_name="filtering-sorting/content.html",
-            context={
-                "clients": data,
-            },
+            template_name="filtering-sorting/update.html",
+            context=context(result),
         )
 
 
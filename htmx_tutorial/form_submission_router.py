@@ -1,21 +1,167 @@
+import asyncio
 import base64
 import io
-from typing import Annotated
+from dataclasses import dataclass
+from typing import IO, Annotated, Literal, Optional
 
 import httpx
-from litestar import Controller, Router, get, post
-from litestar.enums import RequestEncodingType
+from litestar import Controller, Request, Router, get, post
+from litestar.datastructures import UploadFile
 from litestar.exceptions import HTTPException
-from litestar.params import Body
 from litestar.response import Template
-from PIL import Image
-from pydantic import BaseModel, Field
+from litestar.status_codes import (
+    HTTP_400_BAD_REQUEST,
+    HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+)
+from PIL import ExifTags, Image, ImageOps, UnidentifiedImageError
+from pydantic import (
+    BaseModel,
+    Field,
+    ValidationError,
+    field_validator,
+    model_validator,
+)
 from pydantic.networks import Url
 
+from .multipart import parse_multipart_stream
+
+
+# Pillow format name and MIME type of the output formats
+FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg"),
+    "webp": ("WEBP", "image/webp"),
+    "png": ("PNG", "image/png"),
+}
+MAX_SIZES = 6
+MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+# Refuse to decode or produce images above this many pixels (decompression bombs)
+MAX_PIXELS = 50_000_000
+
 
 class ResizeImageDto(BaseModel):
-    url: Url
-    size: Annotated[int, Field(gt=0, le=200)]
+    url: Optional[Url] = None
+    size: Annotated[int, Field(gt=0, le=200)] = 100
+    sizes: str = ""
+    formats: Annotated[list[Literal["jpeg", "webp", "png"]], Field(min_length=1)] = [
+        "jpeg"
+    ]
+
+    @field_validator("formats")
+    @classmethod
+    def unique_formats(cls, formats: list[str]) -> list[str]:
+        """Each format once, in the order they were requested."""
+        return list(dict.fromkeys(formats))
+
+    def percentages(self) -> list[int]:
+        """The requested sizes, the slider's and the extra comma-separated ones."""
+        extra = [int(s) for s in self.sizes.replace(" ", "").split(",") if s]
+        return sorted({self.size, *extra}, reverse=True)
+
+    @model_validator(mode="after")
+    def check_sizes(self) -> "ResizeImageDto":
+        percentages = self.percentages()
+        if any(not 0 < p <= 200 for p in percentages):
+            raise ValueError("Sizes must be between 1 and 200%")
+        if len(percentages) > MAX_SIZES:
+            raise ValueError(f"At most {MAX_SIZES} sizes can be requested at once")
+        return self
+
+
+@dataclass
+class ResizedImage:
+    percentage: int
+    format: str
+    width: int
+    height: int
+    content: bytes
+
+    @property
+    def media_type(self) -> str:
+        return FORMATS[self.format][1]
+
+    @property
+    def data_url(self) -> str:
+        return (
+            f"data:{self.media_type};base64,{base64.b64encode(self.content).decode()}"
+        )
+
+
+def render_variants(
+    file: IO[bytes], percentages: list[int], formats: list[str]
+) -> list[ResizedImage]:
+    """
+    Decode an image once and encode it at every requested size and format.
+
+    Sizes are produced from the largest to the smallest, each downscale starting from
+    the previous, already smaller, result rather than from the full-size image. JPEG
+    sources are decoded directly at the largest size needed when it is smaller than
+    the original (DCT scaling), which skips most of the decoding work.
+    """
+    image = Image.open(file)
+    width, height = image.size
+    if width * height > MAX_PIXELS:
+        raise ValueError("Image is too large")
+
+    largest = max(percentages)
+    if largest < 100:
+        image.draft("RGB", (width * largest // 100, height * largest // 100))
+    # Orientations 5 to 8 rotate the image by a quarter turn
+    if image.getexif().get(ExifTags.Base.Orientation, 1) in (5, 6, 7, 8):
+        width, height = height, width
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if image.has_transparency_data else "RGB")
+
+    results = []
+    for percentage in sorted(percentages, reverse=True):
+        size = (max(1, width * percentage // 100), max(1, height * percentage // 100))
+        if size[0] * size[1] > MAX_PIXELS:
+            raise ValueError("Requested size is too large")
+        if image.size != size:
+            image = image.resize(size, Image.LANCZOS)
+
+        for name in formats:
+            pil_format, _ = FORMATS[name]
+            out = image
+            if pil_format == "JPEG" and image.mode != "RGB":
+                out = image.convert("RGB")
+            buffered = io.BytesIO()
+            out.save(buffered, format=pil_format, quality=85)
+            results.append(ResizedImage(percentage, name, *size, buffered.getvalue()))
+    return results
+
+
+async def download_image(url: str) -> UploadFile:
+    """Download an image into a spooled temporary file, without buffering it whole."""
+    upload = UploadFile("application/octet-stream", url.rsplit("/", 1)[-1])
+    try:
+        async with httpx.AsyncClient() as client:
+            async with client.stream("GET", url) as r:
+                content_type = r.headers.get("content-type", "")
+                if r.is_error or not content_type.startswith("image/"):
+                    raise HTTPException(
+                        detail="Invalid image URL",
+                        status_code=HTTP_400_BAD_REQUEST,
+                    )
+                size = 0
+                async for chunk in r.aiter_bytes():
+                    size += len(chunk)
+                    if size > MAX_UPLOAD_SIZE:
+                        raise HTTPException(
+                            detail="Image is too large",
+                            status_code=HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        )
+                    await upload.write(chunk)
+    except httpx.HTTPError:
+        await upload.close()
+        raise HTTPException(
+            detail="Invalid image URL", status_code=HTTP_400_BAD_REQUEST
+        )
+    except BaseException:
+        await upload.close()
+        raise
+    await upload.seek(0)
+    return upload
 
 
 async def validate_image_url(url: str) -> bool:
@@ -69,46 +215,52 @@ class FormSubmissionController(Controller):
             )
 
     @post("/resize")
-    async def resize(
-        self,
-        data: Annotated[
-            ResizeImageDto, Body(media_type=RequestEncodingType.URL_ENCODED)
-        ],
-    ) -> Template:
-        is_valid = await validate_image_url(str(data.url))
-
-        if not is_valid:
-            raise HTTPException(
-                detail="Invalid image URL", status_code=httpx.HTTPStatus.BAD_REQUEST
-            )
-
-        # Use httpx to download the image
-        async with httpx.AsyncClient() as client:
-            r = await client.get(str(data.url))
-
-        content_type = r.headers.get("content-type")
-
-        # Open the image with PIL
-        image = Image.open(io.BytesIO(r.content))
-
-        # Calculate the new size
-        new_size = tuple(map(lambda x: int(x * data.size / 100), image.size))
+    async def resize(self, request: Request) -> Template:
+        files = {}
+        if request.headers.get("content-type", "").startswith("multipart/form-data"):
+            fields, files = await parse_multipart_stream(request, MAX_UPLOAD_SIZE)
+        else:
+            form = await request.form()
+            fields = {key: form.getall(key) for key in form.keys()}
 
-        # Resize the image
-        resized_image = image.resize(new_size)
+        try:
+            try:
+                data = ResizeImageDto(
+                    **{k: v[-1] for k, v in fields.items() if k != "formats" and v[-1]},
+                    formats=fields.get("formats", ["jpeg"]),
+                )
+            except ValidationError as e:
+                raise HTTPException(detail=str(e), status_code=HTTP_400_BAD_REQUEST)
 
-        # Convert to base64
-        buffered = io.BytesIO()
-        resized_image.save(buffered, format="JPEG")
-        img_str = base64.b64encode(buffered.getvalue()).decode()
+            # Browsers send an empty file part when no file is selected
+            upload = files.get("file")
+            if upload is None or not upload.filename:
+                if data.url is None:
+                    raise HTTPException(
+                        detail="Provide an image URL or upload an image",
+                        status_code=HTTP_400_BAD_REQUEST,
+                    )
+                upload = await download_image(str(data.url))
+                files["url"] = upload
 
-        # Transform to data URL, respect content type
-        data_url = f"data:{content_type};base64,{img_str}"
+            # Decoding and encoding are CPU bound: keep them off the event loop
+            try:
+                images = await asyncio.to_thread(
+                    render_variants, upload.file, data.percentages(), data.formats
+                )
+            except (UnidentifiedImageError, Image.DecompressionBombError, ValueError):
+                raise HTTPException(
+                    detail="Invalid or too large image",
+                    status_code=HTTP_400_BAD_REQUEST,
+                )
+        finally:
+            for file in files.values():
+                await file.close()
 
         return Template(
             template_name="form-submission/resize-output.html",
             context={
-                "url": data_url,
+                "images": images,
             },
         )
 
@@ -1,31 +1,79 @@
-import faker
+import re
+from typing import Annotated, Optional
+
+import numpy as np
 from litestar import Controller, Router, get
+from litestar.params import Parameter
 from litestar.response import Template
 
+from .market import MarketEngine
+
+DEFAULT_WATCHLIST = 20
+MAX_SUBSCRIPTION = 1000
+
+market = MarketEngine()
+
+
+def subscription(symbols: str, count: int) -> np.ndarray:
+    """The tickers listed in `symbols`, or the first `count` tickers if none are."""
+    listed = [s for s in re.split(r"[\s,]+", symbols.upper()) if s]
+    if listed:
+        return market.select(listed[:MAX_SUBSCRIPTION])
+    return np.arange(min(count, market.symbols.size))
+
 
 class LiveDataController(Controller):
     path = "/"
 
     @get()
     async def index_view(self) -> Template:
+        tick = market.advance()
         return Template(
             template_name="live-data/index.html",
+            context={
+                "quotes": market.quotes(subscription("", DEFAULT_WATCHLIST)),
+                "cursor": market.cursor(tick),
+                "count": DEFAULT_WATCHLIST,
+                "max_count": MAX_SUBSCRIPTION,
+            },
         )
 
-    @get("/data")
-    async def get_live_data(self) -> Template:
-        # generate fake stock data
-        fake = faker.Faker()
-        data = {
-            "name": fake.company(),
-            "price": fake.pyfloat(left_digits=4, right_digits=2, positive=True),
-            "change": fake.pyfloat(left_digits=2, right_digits=2, positive=True),
-        }
+    @get("/table")
+    async def get_table(
+        self,
+        symbols: str = "",
+        count: Annotated[int, Parameter(ge=1, le=MAX_SUBSCRIPTION)] = DEFAULT_WATCHLIST,
+    ) -> Template:
+        tick = market.advance()
+        return Template(
+            template_name="live-data/rows.html",
+            context={
+                "quotes": market.quotes(subscription(symbols, count)),
+                "cursor": market.cursor(tick),
+            },
+        )
 
+    @get("/data")
+    async def get_live_data(
+        self,
+        symbols: str = "",
+        count: Annotated[int, Parameter(ge=1, le=MAX_SUBSCRIPTION)] = DEFAULT_WATCHLIST,
+        since: Annotated[Optional[str], Parameter(max_length=64)] = None,
+    ) -> Template:
+        tick = market.advance()
+        # Only the rows changed after the tick the client last saw. A cursor of a
+        # previous engine (the process restarted) gets the whole table instead.
+        last_seen = market.parse_cursor(since) if since else None
+        snapshot = last_seen is None
+        quotes = market.quotes(
+            subscription(symbols, count), -1 if snapshot else last_seen
+        )
         return Template(
             template_name="live-data/data-update.html",
             context={
-                "data": data,
+                "quotes": quotes,
+                "cursor": market.cursor(tick),
+                "snapshot": snapshot,
             },
         )
 
@@ -0,0 +1,193 @@
+from collections import defaultdict
+from typing import AsyncIterator
+
+from litestar import Request
+from litestar.datastructures import UploadFile
+from litestar.exceptions import HTTPException
+from litestar.status_codes import (
+    HTTP_400_BAD_REQUEST,
+    HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+)
+
+MAX_FIELD_SIZE = 64 * 1024
+MAX_PARTS = 32
+# Bytes allowed before the first boundary and in the headers of each part
+MAX_PREAMBLE_SIZE = 16 * 1024
+MAX_HEADERS_SIZE = 16 * 1024
+
+
+def _parse_part_headers(raw: bytes) -> tuple[str, str | None, str]:
+    name, filename, content_type = None, None, "application/octet-stream"
+    for line in raw.decode("latin-1").split("\r\n"):
+        key, _, value = line.partition(":")
+        key = key.strip().lower()
+        if key == "content-type":
+            content_type = value.strip()
+        elif key == "content-disposition":
+            for param in value.split(";")[1:]:
+                param_name, _, param_value = param.strip().partition("=")
+                param_value = param_value.strip('"')
+                if param_name == "name":
+                    name = param_value
+                elif param_name == "filename":
+                    filename = param_value
+    if name is None:
+        raise HTTPException(
+            detail="Malformed multipart part", status_code=HTTP_400_BAD_REQUEST
+        )
+    return name, filename, content_type
+
+
+async def parse_multipart_stream(
+    request: Request,
+    max_file_size: int,
+    max_spool_size: int = 1024 * 1024,
+) -> tuple[dict[str, list[str]], dict[str, UploadFile]]:
+    """
+    Parse a multipart/form-data body as it is received, without buffering it.
+
+    Litestar reads the whole body in memory before parsing a form. Here, the file
+    parts are written chunk by chunk to spooled temporary files instead, which stay
+    in memory up to `max_spool_size` bytes and roll over to disk beyond. A file
+    larger than `max_file_size` is rejected with 413 as soon as it crosses the limit.
+
+    Returns the text fields (every value of each name) and the files by field name.
+    The caller is responsible for closing the files.
+    """
+    _, _, params = request.headers.get("content-type", "").partition(";")
+    boundary = next(
+        (
+            value.strip().strip('"')
+            for key, _, value in (p.strip().partition("=") for p in params.split(";"))
+            if key == "boundary"
+        ),
+        None,
+    )
+    if not boundary:
+        raise HTTPException(
+            detail="Missing multipart boundary", status_code=HTTP_400_BAD_REQUEST
+        )
+
+    fields: dict[str, list[str]] = defaultdict(list)
+    files: dict[str, UploadFile] = {}
+    try:
+        async for name, filename, content_type, chunks in _parts(
+            request.stream(), boundary.encode("latin-1")
+        ):
+            if filename is None:
+                value = bytearray()
+                async for chunk in chunks:
+                    value += chunk
+                    if len(value) > MAX_FIELD_SIZE:
+                        raise HTTPException(
+                            detail=f"Field '{name}' is too large",
+                            status_code=HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        )
+                try:
+                    fields[name].append(value.decode())
+                except UnicodeDecodeError:
+                    raise HTTPException(
+                        detail=f"Field '{name}' is not valid UTF-8",
+                        status_code=HTTP_400_BAD_REQUEST,
+                    )
+                continue
+
+            upload = UploadFile(content_type, filename, max_spool_size=max_spool_size)
+            files[name] = upload
+            size = 0
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_file_size:
+                    raise HTTPException(
+                        detail=f"File '{filename}' is larger than {max_file_size} bytes",
+                        status_code=HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    )
+                await upload.write(chunk)
+            await upload.seek(0)
+    except BaseException:
+        for upload in files.values():
+            await upload.close()
+        raise
+
+    return dict(fields), files
+
+
+async def _parts(stream: AsyncIterator[bytes], boundary: bytes):
+    # Every delimiter, the first one included once the CRLF is prepended, is
+    # CRLF "--" boundary, followed by CRLF (next part) or "--" (end of the body).
+    delimiter = b"\r\n--" + boundary
+    buffer = bytearray(b"\r\n")
+    stream = aiter(stream)
+    exhausted = False
+
+    async def fill() -> bool:
+        nonlocal exhausted
+        if exhausted:
+            return False
+        chunk = await anext(stream, None)
+        if chunk is None:
+            exhausted = True
+            return False
+        buffer.extend(chunk)
+        return True
+
+    async def read_until(marker: bytes, max_size: int, what: str) -> bytes:
+        # Stop reading once the marker can no longer end within max_size bytes
+        while (index := buffer.find(marker)) == -1:
+            if len(buffer) >= max_size + len(marker):
+                break
+            if not await fill():
+                raise HTTPException(
+                    detail="Truncated multipart body", status_code=HTTP_400_BAD_REQUEST
+                )
+        if index == -1 or index > max_size:
+            raise HTTPException(
+                detail=f"Multipart {what} larger than {max_size} bytes",
+                status_code=HTTP_400_BAD_REQUEST,
+            )
+        data = bytes(buffer[:index])
+        del buffer[: index + len(marker)]
+        return data
+
+    async def body_chunks() -> AsyncIterator[bytes]:
+        while True:
+            index = buffer.find(delimiter)
+            if index != -1:
+                if index:
+                    yield bytes(buffer[:index])
+                del buffer[: index + len(delimiter)]
+                return
+            # Keep a tail that could be the beginning of a delimiter.
+            keep = len(delimiter) - 1
+            if len(buffer) > keep:
+                yield bytes(buffer[:-keep])
+                del buffer[:-keep]
+            if not await fill():
+                raise HTTPException(
+                    detail="Truncated multipart body", status_code=HTTP_400_BAD_REQUEST
+                )
+
+    await read_until(delimiter, MAX_PREAMBLE_SIZE, "preamble")
+    for _ in range(MAX_PARTS + 1):
+        while len(buffer) < 2 and await fill():
+            pass
+        if buffer[:2] == b"--":
+            return
+        if buffer[:2] != b"\r\n":
+            raise HTTPException(
+                detail="Malformed multipart body", status_code=HTTP_400_BAD_REQUEST
+            )
+        del buffer[:2]
+
+        name, filename, content_type = _parse_part_headers(
+            await read_until(b"\r\n\r\n", MAX_HEADERS_SIZE, "part headers")
+        )
+        chunks = body_chunks()
+        yield name, filename, content_type, chunks
+        # Skip whatever the consumer did not read.
+        async for _ in chunks:
+            pass
+
+    raise HTTPException(
+        detail="Too many multipart parts", status_code=HTTP_400_BAD_REQUEST
+    )
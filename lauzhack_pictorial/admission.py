@@ -0,0 +1,336 @@
+import asyncio
+import ipaddress
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Collection, Optional
+
+from litestar.types import ASGIApp, Receive, Scope, Send
+
+
+@dataclass
+class TokenBucket:
+    """
+    A token bucket allowing bursts of `capacity` requests, refilled at `rate` per second.
+
+    Args:
+        rate (float): Tokens added per second.
+        capacity (float): Maximum number of tokens, i.e. the allowed burst.
+    """
+
+    rate: float
+    capacity: float
+    tokens: float = field(init=False)
+    updated: float = field(init=False, default_factory=time.monotonic)
+
+    def __post_init__(self):
+        self.tokens = self.capacity
+
+    def take(self) -> float:
+        """
+        Try to take a token.
+
+        Returns:
+            float: 0 if a token was taken, otherwise the seconds until one is available.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def refund(self) -> None:
+        """Give back a token taken for a request that was rejected further on."""
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+    @property
+    def full(self) -> bool:
+        """Whether the bucket has refilled completely, i.e. it holds no state worth keeping."""
+        elapsed = time.monotonic() - self.updated
+        return self.tokens + elapsed * self.rate >= self.capacity
+
+
+@dataclass
+class RouteLimit:
+    """
+    The admission policy of an expensive route.
+
+    Args:
+        method (str): HTTP method of the route, e.g. 'POST'.
+        path (str): Exact path of the route, e.g. '/generate/image'.
+        user_rate (float): Requests per second sustained by a single user.
+        user_burst (int): Requests a single user can send at once.
+        global_rate (float): Requests per second sustained across all users.
+        global_burst (int): Requests all users together can send at once.
+        max_concurrency (int): Requests processed at the same time.
+        max_queue (int): Requests allowed to wait for a processing slot.
+        queue_timeout (float): Seconds a request waits for a slot before being shed.
+    """
+
+    method: str
+    path: str
+    user_rate: float
+    user_burst: int
+    global_rate: float
+    global_burst: int
+    max_concurrency: int
+    max_queue: int
+    queue_timeout: float
+
+
+@dataclass
+class AdmissionStats:
+    """
+    Counters of the admission decisions taken for a route.
+
+    Attributes:
+        admitted (int): Requests let through.
+        queued (int): Requests that had to wait for a processing slot.
+        shed_user (int): Requests rejected with 429 by the user's bucket.
+        shed_global (int): Requests rejected with 503 by the global bucket.
+        shed_overload (int): Requests rejected with 503 because the queue was full or
+                             the wait for a slot timed out.
+        active (int): Requests currently being processed.
+        waiting (int): Requests currently waiting for a slot.
+    """
+
+    admitted: int = 0
+    queued: int = 0
+    shed_user: int = 0
+    shed_global: int = 0
+    shed_overload: int = 0
+    active: int = 0
+    waiting: int = 0
+
+
+class RouteAdmission:
+    """Admission state of a single route: its buckets, semaphore and counters."""
+
+    # Users whose buckets are tracked at most, the least recently seen dropped first.
+    MAX_TRACKED_USERS = 10_000
+
+    def __init__(self, limit: RouteLimit):
+        self.limit = limit
+        self.stats = AdmissionStats()
+        self.global_bucket = TokenBucket(limit.global_rate, limit.global_burst)
+        self.user_buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+        self.slots = asyncio.Semaphore(limit.max_concurrency)
+
+    def user_bucket(self, key: str) -> TokenBucket:
+        bucket = self.user_buckets.get(key)
+        if bucket is not None:
+            self.user_buckets.move_to_end(key)
+            return bucket
+
+        if len(self.user_buckets) >= self.MAX_TRACKED_USERS:
+            # Forget the least recently seen user, even mid-burst, so that the table
+            # stays bounded, then the next ones as long as their bucket refilled.
+            self.user_buckets.popitem(last=False)
+            while self.user_buckets and next(iter(self.user_buckets.values())).full:
+                self.user_buckets.popitem(last=False)
+        bucket = TokenBucket(self.limit.user_rate, self.limit.user_burst)
+        self.user_buckets[key] = bucket
+        return bucket
+
+
+class AdmissionControl:
+    """
+    Registry of the admission policies of an application, shared with its middleware.
+
+    Create one instance per application, pass it to `AdmissionControlMiddleware`
+    and read `snapshot()` to expose the counters.
+
+    Args:
+        limits (list[RouteLimit]): The policies of the routes to protect. Requests to
+                                   other routes are not affected.
+    """
+
+    def __init__(self, limits: list[RouteLimit]):
+        self.routes = {(limit.method, limit.path): limit for limit in limits}
+        self._states: dict[tuple[str, str], RouteAdmission] = {}
+
+    def route(self, method: str, path: str) -> Optional[RouteAdmission]:
+        key = (method, path.rstrip("/") or "/")
+        limit = self.routes.get(key)
+        if limit is None:
+            return None
+        # Created lazily so that the semaphore binds to the running event loop.
+        if key not in self._states:
+            self._states[key] = RouteAdmission(limit)
+        return self._states[key]
+
+    def snapshot(self) -> dict:
+        """Return the counters of every protected route, keyed by 'METHOD path'."""
+        return {
+            f"{method} {path}": vars(state.stats).copy()
+            for (method, path), state in self._states.items()
+        }
+
+
+class AdmissionControlMiddleware:
+    """
+    ASGI middleware shedding load on expensive routes before it reaches the handlers.
+
+    For a protected route, a request must take a token from the bucket of its user
+    (429 otherwise), then from the global bucket (503 otherwise), then get one of
+    the route's processing slots. When all slots are busy, it waits in a bounded
+    queue for up to `queue_timeout` seconds; a full queue or an expired wait is
+    answered with 503. Rejections are immediate and carry a `Retry-After` header,
+    so a burst cannot pile up and slow down the well-behaved users.
+
+    A request rejected by the global bucket or the queue was not the user's doing:
+    the tokens it took are given back, so that an overload does not also count
+    against the user's own rate.
+
+    The user is identified by `scope["user"].id` when an authentication middleware
+    ran before this one, and by the client address otherwise. Behind a reverse proxy,
+    every request comes from the proxy's address: when it is one of the
+    `trusted_proxies`, the client address is read from the `X-Forwarded-For` header
+    instead, as the last address the proxies did not add themselves.
+
+    Args:
+        app (ASGIApp): The application to protect.
+        admission (AdmissionControl): The policies of the protected routes.
+        trusted_proxies (Collection[str]): Addresses or networks (e.g. '10.0.0.0/8')
+                                           of the proxies whose X-Forwarded-For header
+                                           is trusted. Defaults to the loopback.
+
+    Usage:
+        ```
+        admission = AdmissionControl([RouteLimit("POST", "/generate/image", ...)])
+        app = Litestar(
+            middleware=[
+                CookieAuthenticationMiddleware,
+                DefineMiddleware(AdmissionControlMiddleware, admission=admission),
+            ]
+        )
+        ```
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        admission: AdmissionControl,
+        trusted_proxies: Collection[str] = ("127.0.0.1", "::1"),
+    ):
+        self.app = app
+        self.admission = admission
+        self.trusted_proxies = [
+            ipaddress.ip_network(proxy.strip(), strict=False)
+            for proxy in trusted_proxies
+            if proxy.strip()
+        ]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        route = None
+        if scope["type"] == "http":
+            route = self.admission.route(scope["method"], scope["path"])
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+
+        stats = route.stats
+
+        # The user's bucket comes first, so that a user over their rate does not
+        # drain the global bucket for everybody else.
+        user_bucket = route.user_bucket(self._user_key(scope))
+        wait = user_bucket.take()
+        if wait:
+            stats.shed_user += 1
+            await self._reject(send, 429, wait)
+            return
+
+        wait = route.global_bucket.take()
+        if wait:
+            user_bucket.refund()
+            stats.shed_global += 1
+            await self._reject(send, 503, wait)
+            return
+
+        if route.slots.locked():
+            if stats.waiting >= route.limit.max_queue:
+                user_bucket.refund()
+                route.global_bucket.refund()
+                stats.shed_overload += 1
+                await self._reject(send, 503, route.limit.queue_timeout)
+                return
+
+            stats.queued += 1
+            stats.waiting += 1
+            try:
+                await asyncio.wait_for(route.slots.acquire(), route.limit.queue_timeout)
+            except asyncio.TimeoutError:
+                user_bucket.refund()
+                route.global_bucket.refund()
+                stats.shed_overload += 1
+                await self._reject(send, 503, route.limit.queue_timeout)
+                return
+            finally:
+                stats.waiting -= 1
+        else:
+            await route.slots.acquire()
+
+        stats.admitted += 1
+        stats.active += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            stats.active -= 1
+            route.slots.release()
+
+    def _user_key(self, scope: Scope) -> str:
+        user = scope.get("user")
+        if user is not None:
+            return f"user:{user.id}"
+        address = self._client_address(scope)
+        return f"client:{address}" if address else "client:unknown"
+
+    def _client_address(self, scope: Scope) -> Optional[str]:
+        client = scope.get("client")
+        address = client[0] if client else None
+        if address is None or not self._trusted(address):
+            return address
+
+        forwarded = ",".join(
+            value.decode("latin-1")
+            for name, value in scope["headers"]
+            if name == b"x-forwarded-for"
+        )
+        # Each proxy appends the address it received the request from: the client
+        # is the first one, from the right, that is not a trusted proxy. Addresses
+        # further left were sent by the client and can be forged.
+        for hop in reversed(forwarded.split(",")):
+            hop = hop.strip()
+            if not hop:
+                continue
+            address = hop
+            if not self._trusted(hop):
+                break
+        return address
+
+    def _trusted(self, address: str) -> bool:
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        return any(ip in network for network in self.trusted_proxies)
+
+    @staticmethod
+    async def _reject(send: Send, status: int, retry_after: float) -> None:
+        body = b"Too Many Requests" if status == 429 else b"Service Unavailable"
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", b"text/plain; charset=utf-8"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(math.ceil(retry_after)).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
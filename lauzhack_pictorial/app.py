@@ -3,14 +3,27 @@ from pathlib import Path
 # Importing important classes and functions from Litestar
 from litestar import Litestar
 from litestar.contrib.jinja import JinjaTemplateEngine
+from litestar.middleware import DefineMiddleware
 from litestar.static_files.config import StaticFilesConfig
 from litestar.template.config import TemplateConfig
 
 # Importing application-specific configurations and components
 from .config import CONFIG
+from .admission import AdmissionControlMiddleware
+from .assets import assets_router, register_template_globals
+from .compression import compression_config
 from .db import repo_provider
+from .logs import RequestLoggingMiddleware, logging_config
 from .middlewares import CookieAuthenticationMiddleware
-from .routers import generate_router, library_router, main_router
+from .routers import (
+    admission,
+    generate_router,
+    health_router,
+    images_router,
+    library_router,
+    main_router,
+)
+from .storage import storage_provider
 
 # Application configuration object (defined in the config module)
 CONFIG
@@ -31,11 +44,17 @@ def configure_app():
     """
     # Create and configure the Litestar application instance
     app = Litestar(
-        lifespan=[repo_provider],  # Lifespan methods for startup and shutdown
+        lifespan=[
+            repo_provider,
+            storage_provider,
+        ],  # Lifespan methods for startup and shutdown
         route_handlers=[
             main_router,  # Router for the main set of routes
             generate_router,  # Router for generation-specific routes
             library_router,  # Router for library-related routes
+            health_router,  # Router for per-worker liveness and readiness probes
+            images_router,  # Router redirecting to the stored images
+            assets_router,  # Router serving the fingerprinted, precompressed assets
         ],
         static_files_config=[
             StaticFilesConfig(
@@ -46,10 +65,32 @@ def configure_app():
         template_config=TemplateConfig(
             directory=Path(__file__).parent / "templates",  # Path to template directory
             engine=JinjaTemplateEngine,  # Template engine to use (Jinja)
+            engine_callback=register_template_globals,  # Adds `asset_url`
+        ),
+        # JSON logs written by a background thread, quieter for the static files
+        logging_config=logging_config(
+            CONFIG.LOG_LEVEL, levels={"/static": "WARNING", "/assets": "WARNING"}
+        ),
+        # Compress pages and fragments, not the assets and archives that already are
+        compression_config=compression_config(
+            exclude=["^/static", "^/assets", "^/library/export"]
         ),
         middleware=[
-            CookieAuthenticationMiddleware
-        ],  # Middleware for handling cookie authentication
+            # Middleware giving each request an ID and logging it, probes sampled at 1%
+            DefineMiddleware(
+                RequestLoggingMiddleware,
+                sample_rates={"/health": 0.01, "/ready": 0.01},
+            ),
+            # Middleware for handling cookie authentication
+            CookieAuthenticationMiddleware,
+            # Middleware shedding load on expensive routes, per user once authenticated
+            # and per client address, as forwarded by the proxies, otherwise
+            DefineMiddleware(
+                AdmissionControlMiddleware,
+                admission=admission,
+                trusted_proxies=CONFIG.TRUSTED_PROXIES.split(","),
+            ),
+        ],
     )
     return app
 
@@ -0,0 +1,169 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import shutil
+from functools import lru_cache
+from pathlib import Path
+
+from litestar import Controller, Request, Router, get
+from litestar.exceptions import NotFoundException
+from litestar.response import File
+
+from .compression import BROTLI_AVAILABLE, accepted_encodings
+
+if BROTLI_AVAILABLE:
+    import brotli
+
+# Where the source assets are (the tailwind output among others) and where the
+# fingerprinted, precompressed copies are written by `build_assets`.
+SOURCE_DIR = Path("static")
+DIST_DIR = Path("dist")
+MANIFEST_NAME = "manifest.json"
+
+# Only text assets compress; images such as the generated PNGs are already compressed.
+ASSET_SUFFIXES = {".css", ".js", ".svg", ".json", ".txt"}
+
+# The precompressed variants, from the preferred one to the least preferred one.
+VARIANTS = [("br", ".br"), ("gzip", ".gz")]
+
+
+def build_assets(source: Path = SOURCE_DIR, target: Path = DIST_DIR) -> dict:
+    """
+    Fingerprints and precompresses the static assets, once, at build time.
+
+    Every text asset of `source` is copied into `target` under a name containing a
+    hash of its content (e.g. 'output.css' becomes 'output.3f2a9c1b0d4e.css'), next to
+    a gzip variant and, when the 'brotli' package is installed, a brotli variant, both
+    at their maximum compression level. A variant is only kept if it is smaller than
+    the original. Since the name changes with the content, browsers can cache the
+    assets forever. The mapping from the original names to the fingerprinted ones is
+    written to 'manifest.json' and used by `asset_url`.
+
+    Args:
+        source (Path): The directory containing the assets to build.
+        target (Path): The directory the built assets are written to. It is emptied first.
+
+    Returns:
+        dict: The manifest, mapping the original names to the fingerprinted names.
+    """
+    shutil.rmtree(target, ignore_errors=True)
+    target.mkdir(parents=True)
+
+    manifest = {}
+    for path in sorted(source.iterdir()):
+        if not path.is_file() or path.suffix not in ASSET_SUFFIXES:
+            continue
+
+        content = path.read_bytes()
+        digest = hashlib.sha256(content).hexdigest()[:12]
+        hashed_name = f"{path.stem}.{digest}{path.suffix}"
+        (target / hashed_name).write_bytes(content)
+
+        # mtime=0 keeps the gzip output identical from one build to the next.
+        variants = {".gz": gzip.compress(content, compresslevel=9, mtime=0)}
+        if BROTLI_AVAILABLE:
+            variants[".br"] = brotli.compress(content, quality=11)
+        for suffix, compressed in variants.items():
+            if len(compressed) < len(content):
+                (target / f"{hashed_name}{suffix}").write_bytes(compressed)
+
+        manifest[path.name] = hashed_name
+
+    (target / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+@lru_cache(maxsize=1)
+def load_manifest() -> dict:
+    """Read the manifest written by `build_assets`, once per process. Empty if not built."""
+    try:
+        return json.loads((DIST_DIR / MANIFEST_NAME).read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def asset_url(name: str) -> str:
+    """
+    Returns the URL of a static asset, to be used in the templates.
+
+    Once the assets are built, this is the URL of the fingerprinted copy served by the
+    AssetsController. Otherwise (e.g. in development, with tailwind watching the
+    sources) this is the URL of the file in the 'static' directory.
+
+    Args:
+        name (str): The name of the asset in the 'static' directory, e.g. 'output.css'.
+
+    Returns:
+        str: The URL of the asset.
+    """
+    hashed_name = load_manifest().get(name)
+    if hashed_name is None:
+        return f"/static/{name}"
+    return f"/assets/{hashed_name}"
+
+
+class AssetsController(Controller):
+    """
+    The AssetsController serves the assets built by `build_assets`. It picks the
+    precompressed variant accepted by the browser, so that nothing is compressed on
+    the fly, and lets the browser cache it for a year without revalidation since the
+    content of a fingerprinted name never changes.
+    """
+
+    path = "/"
+
+    @get("/{name:str}", include_in_schema=False)
+    async def asset(self, request: Request, name: str) -> File:
+        """
+        Serves a fingerprinted asset, brotli or gzip encoded if the browser accepts it.
+
+        Args:
+            request (Request): The request, whose Accept-Encoding header is read.
+            name (str): The fingerprinted name of the asset.
+
+        Raises:
+            NotFoundException: If the name is not one of the built assets.
+
+        Returns:
+            File: The asset, or its best accepted precompressed variant.
+        """
+        # Only the names of the manifest are served, which also rules out any path
+        # traversal.
+        if name not in load_manifest().values():
+            raise NotFoundException()
+
+        headers = {
+            "Cache-Control": "public, max-age=31536000, immutable",
+            "Vary": "Accept-Encoding",
+        }
+        path = DIST_DIR / name
+        encodings = accepted_encodings(request.headers.get("accept-encoding", ""))
+        for encoding, suffix in VARIANTS:
+            variant = DIST_DIR / f"{name}{suffix}"
+            if encoding in encodings and variant.exists():
+                headers["Content-Encoding"] = encoding
+                path = variant
+                break
+
+        return File(
+            path,
+            filename=name,
+            content_disposition_type="inline",
+            media_type=mimetypes.guess_type(name)[0] or "application/octet-stream",
+            headers=headers,
+        )
+
+
+# The Router serving the built assets under '/assets'.
+assets_router = Router(path="/assets", route_handlers=[AssetsController])
+
+
+def register_template_globals(engine) -> None:
+    """Makes `asset_url` available to the Jinja templates of an application."""
+    engine.engine.globals["asset_url"] = asset_url
+
+
+if __name__ == "__main__":
+    for name, hashed_name in build_assets().items():
+        print(f"{SOURCE_DIR / name} -> {DIST_DIR / hashed_name}")
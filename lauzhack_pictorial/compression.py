@@ -0,0 +1,55 @@
+from litestar.config.compression import CompressionConfig
+
+try:
+    import brotli  # noqa: F401
+
+    BROTLI_AVAILABLE = True
+except ImportError:  # pragma: no cover - brotli is an optional dependency
+    BROTLI_AVAILABLE = False
+
+
+def compression_config(exclude: list[str]) -> CompressionConfig:
+    """
+    The response compression shared by the applications.
+
+    Responses are compressed with brotli when the 'brotli' package is installed and
+    the browser accepts it, and with gzip otherwise. Bodies smaller than 500 bytes
+    are sent as is: a typical htmx fragment below that size does not shrink enough
+    to pay for the extra CPU and header. Streamed responses (server-sent events,
+    large pages) are compressed and flushed chunk by chunk, so they keep streaming.
+
+    The levels are tuned for content compressed on every request: brotli quality 5
+    and gzip level 6 give most of the size reduction of the maximum levels for a
+    fraction of their CPU cost. Static assets are compressed once, at the maximum
+    levels, by the build step of `assets.py`.
+
+    Args:
+        exclude (list[str]): Path patterns not to compress, e.g. responses that are
+                             already compressed.
+
+    Returns:
+        CompressionConfig: The configuration to pass to the Litestar application.
+    """
+    return CompressionConfig(
+        backend="brotli" if BROTLI_AVAILABLE else "gzip",
+        brotli_gzip_fallback=True,
+        brotli_quality=5,
+        gzip_compress_level=6,
+        minimum_size=500,
+        exclude=exclude,
+    )
+
+
+def accepted_encodings(accept_encoding: str) -> set[str]:
+    """Parse an Accept-Encoding header into the set of encodings it allows (q > 0)."""
+    encodings = set()
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = params.strip().removeprefix("q=").strip() if params else "1"
+        try:
+            allowed = float(q) > 0
+        except ValueError:
+            allowed = False
+        if name and allowed:
+            encodings.add(name.strip().lower())
+    return encodings
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
 
@@ -19,6 +21,25 @@ class Config(BaseSettings):
         DATABASE_URL (str): Database connection URL read from the DATABASE_URL
                             environment variable. Required to configure the
                             database connection for the application.
+        SECRET_KEY (str): Secret used to sign session cookies, read from the
+                          SECRET_KEY environment variable. Every worker process
+                          must share the same value so that a session issued by
+                          one worker is accepted by all the others.
+        OPENAI_BUDGET_SECONDS (float): Maximum time spent on a call to the OpenAI API,
+                                       retries included. Defaults to 90 seconds.
+        OPENAI_HEDGE (bool): Whether to send a second, hedged request to the OpenAI
+                             API when the first one is slower than the recent p95
+                             latency. Off by default since it can double the cost.
+        STORAGE_BACKEND (str): Where generated images are stored: 'local' (the 'static'
+                               directory, the default) or 's3'.
+        S3_ENDPOINT_URL, S3_BUCKET, S3_ACCESS_KEY, S3_SECRET_KEY, S3_REGION (str):
+                               The S3-compatible object store used by the 's3' backend.
+        S3_PRESIGN_EXPIRES (int): Validity, in seconds, of the presigned image URLs.
+        LOG_LEVEL (str): Log level of the application, e.g. 'DEBUG'. Defaults to 'INFO'.
+        TRUSTED_PROXIES (str): Comma-separated addresses or networks of the reverse
+                               proxies in front of the application, whose
+                               X-Forwarded-For header tells the client address.
+                               Defaults to the loopback.
 
     Example usage within application:
         - To access the DATABASE_URL, assuming an instance of Config named CONFIG:
@@ -32,6 +53,18 @@ class Config(BaseSettings):
     """
 
     DATABASE_URL: str
+    SECRET_KEY: str
+    OPENAI_BUDGET_SECONDS: float = 90.0
+    OPENAI_HEDGE: bool = False
+    STORAGE_BACKEND: Literal["local", "s3"] = "local"
+    S3_ENDPOINT_URL: str = "http://localhost:9000"
+    S3_BUCKET: str = "pictorial"
+    S3_ACCESS_KEY: str = ""
+    S3_SECRET_KEY: str = ""
+    S3_REGION: str = "us-east-1"
+    S3_PRESIGN_EXPIRES: int = 3600
+    LOG_LEVEL: Literal["DEBUG", "INFO", "WARNING", "ERROR"] = "INFO"
+    TRUSTED_PROXIES: str = "127.0.0.1,::1"
 
 
 # Create a Config instance to load and hold our environment-based configuration
@@ -1,18 +1,99 @@
+import json
+import re
+import secrets
+import time
+import unicodedata
 from contextlib import asynccontextmanager
 from dataclasses import dataclass
+from functools import lru_cache
+from itertools import starmap
 from pathlib import Path
-from typing import Any, AsyncGenerator, Optional
+from typing import Any, AsyncGenerator, AsyncIterator, Optional
 
 import aiosql
 import aiosqlite
 from litestar import Litestar
 
-from .models import Generation, User
+from .group_commit import GroupCommitter
+from .models import Batch, Generation, User
 
 # Load SQL queries from queries.sql file using aiosql.
 queries = aiosql.from_path(Path(__file__).parent / "queries.sql", "aiosqlite")
 
-__all__ = ["repo_provider"]
+__all__ = ["GroupCommitter", "connect", "repo_provider"]
+
+# How long a connection waits for another process' write lock before giving up.
+BUSY_TIMEOUT_SECONDS = 5.0
+
+# How long a registered batch waits for its stream to be opened before expiring.
+BATCH_TTL_SECONDS = 300
+
+
+# Longest prefix indexed by `generations_fts` (its `prefix` option). A longer prefix
+# would make FTS5 merge the doclists of every term it matches, for all the users.
+FTS_MAX_PREFIX = 6
+
+# The characters of a token for the unicode61 tokenizer of FTS5: letters and digits.
+_FTS_TOKEN = re.compile(r"[^\W_]+")
+
+
+def fts_tokens(text: str) -> list[str]:
+    """
+    Split text into tokens as the unicode61 tokenizer of FTS5 does.
+
+    Tokens are lower-cased and stripped of their diacritics ('Éclairs' -> 'eclairs'),
+    so that they compare the way FTS5 compares the indexed prompts. SQLite's own
+    lower() only folds ASCII letters.
+    """
+    decomposed = unicodedata.normalize("NFD", text)
+    folded = "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+    return _FTS_TOKEN.findall(folded)
+
+
+@lru_cache(maxsize=64)
+def _json_words(words: str) -> tuple[str, ...]:
+    return tuple(json.loads(words))
+
+
+def prompt_has_prefixes(prompt: str, words: str) -> bool:
+    """
+    Whether every word of a JSON list starts a token of the prompt.
+
+    Registered as an SQL function on every connection (see `connect`), to check the
+    words longer than FTS_MAX_PREFIX that the full-text index only matched on their
+    first characters.
+    """
+    expected = _json_words(words)
+    if not expected:
+        return True
+    tokens = fts_tokens(prompt)
+    return all(any(token.startswith(word) for token in tokens) for word in expected)
+
+
+def fts_user_query(user_id: int, query: str) -> tuple[str, list[str]]:
+    """
+    Turn free text typed by a user into a safe FTS5 query over their generations.
+
+    The match is restricted to the user's owner token, so FTS5 only reads the index
+    entries of their generations. Every word is quoted, which neutralizes FTS5
+    operators and syntax characters, and suffixed with `*` to match as a prefix.
+    Words longer than FTS_MAX_PREFIX are matched on their first characters, and
+    their tokens are returned, folded as FTS5 folds them, to be checked against the
+    prompts with `prompt_has_prefixes`.
+    e.g. (42, 'red Waterco') -> ('owner:"u42" AND prompt:("red"* "Waterc"*)', ['waterco'])
+
+    Returns:
+        tuple[str, list[str]]: The MATCH expression, empty when the query has no
+                               words, and the tokens longer than FTS_MAX_PREFIX.
+    """
+    words = query.split()
+    if not words:
+        return "", []
+    prefixes = " ".join(
+        '"{}"*'.format(word[:FTS_MAX_PREFIX].replace('"', '""')) for word in words
+    )
+    long_words = [token for token in fts_tokens(query) if len(token) > FTS_MAX_PREFIX]
+    return f'owner:"u{user_id}" AND prompt:({prefixes})', long_words
 
 
 @dataclass
@@ -27,50 +108,199 @@ class Repository:
     Args:
         conn (aiosqlite.Connection): An asynchronous connection to the SQLite database.
         queries (Any): Loaded SQL queries using aiosql.
+        writer (GroupCommitter): Batches the inserts of concurrent requests into shared
+                                 transactions, so they pay for a single commit.
 
     Returns:
         Provides a series of asynchronous methods for database operations such as getting users,
-        creating users, or creating generations. Each method returns the appropriate pydantic model.
+        creating users, or creating generations. Each method returns the appropriate model,
+        built positionally from the row tuple without any validation.
     """
 
     conn: aiosqlite.Connection
     queries: Any
+    writer: GroupCommitter
 
     async def get_users(self) -> list[User]:
         """Retrieve a list of all users in the database."""
         users = await self.queries.get_users(self.conn)
-        return [User(**user) for user in users]
+        return list(starmap(User, users))
 
     async def get_user_by_credentials(
         self, email: str, password: str
     ) -> Optional[User]:
         """Get a user from the database based on email and password."""
         user = await self.queries.get_user_by_credentials(self.conn, email, password)
-        return User(**user) if user else None
+        return User(*user) if user else None
 
     async def get_user_by_id(self, id: int) -> Optional[User]:
         """Get a user from the database based on user ID."""
         user = await self.queries.get_user_by_id(self.conn, id)
-        return User(**user) if user else None
+        return User(*user) if user else None
 
     async def create_user(self, email: str, password: str) -> int:
-        """Create a new user in the database and returns the user ID."""
-        user_id = await self.queries.create_user(self.conn, email, password)
-        await self.conn.commit()
-        return user_id
+        """Create a new user in the database and returns the user ID once committed."""
+        return await self.writer.submit(self.queries.create_user, email, password)
 
     async def create_generation(self, user_id: int, image_id: str, prompt: str) -> int:
-        """Create a new generation record associated with the user."""
-        generation_id = await self.queries.create_generation(
-            self.conn, user_id, image_id, prompt
+        """Create a new generation record associated with the user, once committed."""
+        return await self.writer.submit(
+            self.queries.create_generation, user_id, image_id, prompt
+        )
+
+    async def create_generations(self, generations: list[dict]) -> None:
+        """
+        Create several generation records in a single transaction, once committed.
+
+        Each generation is a dictionary with the `user_id`, `image_id` and `prompt` keys.
+        """
+        await self.writer.submit(self.queries.create_generations, generations)
+
+    async def create_batch(self, user_id: int, size: str, prompts: list[str]) -> str:
+        """
+        Register a batch generation for a later request to run, once committed.
+
+        Batches whose stream was not opened within BATCH_TTL_SECONDS are deleted
+        along the way.
+
+        Returns:
+            str: The unguessable ID of the batch, to claim it with `claim_batch`.
+        """
+        batch_id = secrets.token_urlsafe(16)
+        now = time.time()
+
+        async def create(conn: aiosqlite.Connection) -> None:
+            await self.queries.delete_expired_batches(
+                conn, before=now - BATCH_TTL_SECONDS
+            )
+            await self.queries.create_batch(
+                conn,
+                id=batch_id,
+                user_id=user_id,
+                size=size,
+                prompts=json.dumps(prompts),
+                created_at=now,
+            )
+
+        await self.writer.submit(create)
+        return batch_id
+
+    async def claim_batch(self, user_id: int, batch_id: str) -> Optional[Batch]:
+        """
+        Take a batch registered by the user, once committed.
+
+        A batch can only be claimed once, by the user who registered it and before
+        it expires: None is returned otherwise.
+        """
+        batch = await self.writer.submit(
+            self.queries.claim_batch,
+            id=batch_id,
+            user_id=user_id,
+            since=time.time() - BATCH_TTL_SECONDS,
         )
-        await self.conn.commit()
-        return generation_id
+        if batch is None:
+            return None
+        id, user_id, size, prompts = batch
+        return Batch(id, user_id, size, json.loads(prompts))
 
     async def get_user_generations(self, user_id: int) -> list[Generation]:
         """Retrieve a list of generations associated with the user."""
         generations = await self.queries.get_user_generations(self.conn, user_id)
-        return [Generation(**generation) for generation in generations]
+        return list(starmap(Generation, generations))
+
+    async def get_user_generation_by_image_id(
+        self, user_id: int, image_id: str
+    ) -> Optional[Generation]:
+        """Get the generation of an image, or None if it does not belong to the user."""
+        generation = await self.queries.get_user_generation_by_image_id(
+            self.conn, image_id=image_id, user_id=user_id
+        )
+        return Generation(*generation) if generation else None
+
+    async def iter_user_generations(
+        self, user_id: int, page_size: int = 500
+    ) -> AsyncIterator[Generation]:
+        """
+        Iterate over the generations of a user in id order, one page at a time.
+
+        Pages are fetched with keyset pagination (`id > last id seen`), so every page
+        is a short indexed query: memory stays bounded by the page size, however large
+        the library, and the shared connection is free for other requests between pages.
+        """
+        after = 0
+        while True:
+            generations = await self.queries.get_user_generations_page(
+                self.conn, user_id=user_id, after=after, limit=page_size
+            )
+            for generation in starmap(Generation, generations):
+                yield generation
+            if len(generations) < page_size:
+                return
+            after = generations[-1][0]
+
+    async def search_user_generations(
+        self, user_id: int, query: str, limit: int = 20, offset: int = 0
+    ) -> list[Generation]:
+        """
+        Full-text search through the prompts of a user's generations.
+
+        Results come from the `generations_fts` FTS5 index, most recent first, and
+        are paginated with `limit` and `offset`. Each word of the query is matched as
+        a prefix, so the search works while the user is still typing.
+
+        Note:
+            Ranking by relevance (bm25) would read the whole index entries of every
+            word, across all users, to weigh them: tens of milliseconds for common
+            words at millions of generations. Ordering by rowid lets FTS5 stop at the
+            first page of the user's matches.
+        """
+        match, long_words = fts_user_query(user_id, query)
+        if not match:
+            return []
+
+        generations = await self.queries.search_user_generations(
+            self.conn,
+            query=match,
+            words=json.dumps(long_words),
+            user_id=user_id,
+            limit=limit,
+            offset=offset,
+        )
+        return list(starmap(Generation, generations))
+
+    async def ping(self) -> bool:
+        """Check that the database connection is usable (used by readiness probes)."""
+        try:
+            await self.conn.execute("select 1")
+        except Exception:
+            return False
+        return True
+
+
+async def connect(path: str = "db/db.sqlite3") -> aiosqlite.Connection:
+    """
+    Open a connection to the SQLite database, configured for the application.
+
+    Note:
+        - In production several worker processes each open their own connection to the
+          same SQLite file. Write-ahead logging lets readers proceed while a writer holds
+          the lock, and the busy timeout makes a writer wait for the other workers'
+          transactions instead of failing with "database is locked".
+        - Synchronous mode stays 'full' so that a committed write survives a power loss:
+          the group-commit writer acknowledges callers only once their write is durable.
+    """
+    conn = await aiosqlite.connect(path, timeout=BUSY_TIMEOUT_SECONDS)
+    conn.row_factory = aiosqlite.Row
+
+    # Coordinate concurrent writers across worker processes.
+    await conn.execute("pragma journal_mode = wal")
+    await conn.execute("pragma synchronous = full")
+    await conn.execute(f"pragma busy_timeout = {int(BUSY_TIMEOUT_SECONDS * 1000)}")
+    await conn.create_function(
+        "prompt_has_prefixes", 2, prompt_has_prefixes, deterministic=True
+    )
+
+    return conn
 
 
 @asynccontextmanager
@@ -88,14 +318,19 @@ async def repo_provider(app: Litestar) -> AsyncGenerator[None, None]:
     Yields:
         None: While yielding, the application has access to the repository.
 
-    Ensures that the database connection is closed after the completion of the request lifecycle.
+    Ensures that pending writes are committed and the database connection is closed
+    after the completion of the request lifecycle.
     """
-    conn = await aiosqlite.connect("db/db.sqlite3")
-    conn.row_factory = aiosqlite.Row
+    conn = await connect()
+
+    # Start the group-commit writer shared by all requests of this worker.
+    writer = GroupCommitter(conn)
+    writer.start()
 
-    app.state.repository = Repository(conn, queries)
+    app.state.repository = Repository(conn, queries, writer)
 
     try:
         yield
     finally:
+        await writer.stop()
         await conn.close()
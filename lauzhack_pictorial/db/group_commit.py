@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+# A write is any coroutine function taking the connection as first argument, such as
+# the aiosql insert queries: `queries.create_generation(conn, user_id, ...)`.
+Write = Callable[..., Awaitable[Any]]
+
+
+@dataclass
+class GroupCommitter:
+    """
+    Batches writes from concurrent requests into a single transaction.
+
+    Instead of committing after every insert, callers submit their write and wait.
+    A background task takes every write queued while the previous batch was being
+    committed, executes them on the shared connection and commits them all at
+    once. Each caller is only acknowledged once the commit covering its write has
+    succeeded, so durability is unchanged while the cost of a commit is shared by
+    every write of the batch.
+
+    No caller is left waiting: a batch whose commit or rollback fails, or whose
+    transaction SQLite rolled back by itself, fails all of its writes, and the
+    committer goes on with the next batch. Once stopped or cancelled, it fails the
+    writes it still holds, and `submit` raises.
+
+    Args:
+        conn (aiosqlite.Connection): The connection the writes are executed on.
+        window (float): Extra time, in seconds, to wait for more writes before executing
+                        a batch. The default of 0 relies on the writes that pile up
+                        while the previous commit is in flight, adding no latency.
+        max_batch (int): Maximum number of writes committed together.
+
+    Usage:
+        ```
+        committer = GroupCommitter(conn)
+        committer.start()
+        user_id = await committer.submit(queries.create_user, email, password)
+        await committer.stop()
+        ```
+    """
+
+    conn: aiosqlite.Connection
+    window: float = 0.0
+    max_batch: int = 256
+
+    _queue: asyncio.Queue = field(default_factory=asyncio.Queue, init=False)
+    _task: Optional[asyncio.Task] = field(default=None, init=False)
+    _closed: bool = field(default=True, init=False)
+
+    @property
+    def running(self) -> bool:
+        """Whether submitted writes will be committed."""
+        return not self._closed and self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start the background task committing the queued writes."""
+        self._closed = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Commit the writes still queued, then stop the background task."""
+        self._closed = True
+        if self._task:
+            self._queue.put_nowait(None)
+            await self._task
+            self._task = None
+
+    async def submit(self, write: Write, *args: Any, **kwargs: Any) -> Any:
+        """
+        Queue a write and wait until the transaction containing it is committed.
+
+        Args:
+            write (Write): Coroutine function called as `write(conn, *args, **kwargs)`.
+
+        Returns:
+            Any: Whatever the write returned, e.g. the ID of the inserted row.
+
+        Raises:
+            RuntimeError: If the committer is not running, e.g. once stopped.
+            Exception: The error raised by the write itself, or by the commit.
+        """
+        if not self.running:
+            raise RuntimeError("the group committer is not running")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((write, args, kwargs, future))
+        return await future
+
+    async def _run(self) -> None:
+        batch = []
+        try:
+            while True:
+                # Wait for the first write, then give concurrent requests a chance to
+                # join.
+                first = await self._queue.get()
+                if first is None:
+                    return
+                batch = [first]
+                await asyncio.sleep(self.window)
+
+                stopping = False
+                while len(batch) < self.max_batch and not self._queue.empty():
+                    item = self._queue.get_nowait()
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item)
+
+                await self._commit_batch(batch)
+
+                # Writes queued after the stop sentinel would never be acknowledged.
+                if stopping:
+                    await self._commit_batch(self._drain())
+                    return
+        finally:
+            # Whatever the reason the loop ended, no caller is left waiting forever.
+            self._closed = True
+            error = RuntimeError("the group committer is not running")
+            _fail(batch + self._drain(), error)
+
+    async def _commit_batch(self, batch: list) -> None:
+        """Commit a batch, failing its writes on any error instead of exiting."""
+        try:
+            await self._commit(batch)
+        except Exception as error:
+            logger.exception("group commit failed", extra={"writes": len(batch)})
+            _fail(batch, error)
+        except BaseException:
+            # Cancelled: whether the writes were committed is unknown.
+            _fail(batch, RuntimeError("the group committer was cancelled"))
+            raise
+
+    def _drain(self) -> list:
+        items = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                items.append(item)
+        return items
+
+    async def _commit(self, batch: list) -> None:
+        if not batch:
+            return
+
+        # Submit every write at once so that they are pipelined on the connection's
+        # thread. A failing statement only rolls back itself in SQLite, so its error
+        # is reported to its caller and the rest of the batch goes on.
+        results = await asyncio.gather(
+            *(write(self.conn, *args, **kwargs) for write, args, kwargs, _ in batch),
+            return_exceptions=True,
+        )
+        outcomes = [
+            (future, None, result)
+            if isinstance(result, BaseException)
+            else (future, result, None)
+            for (_, _, _, future), result in zip(batch, results)
+        ]
+
+        # A failed commit fails every write of the batch.
+        try:
+            if any(map(_aborts_transaction, results)) or (
+                not self.conn.in_transaction
+                and not all(isinstance(result, BaseException) for result in results)
+            ):
+                raise sqlite3.OperationalError(
+                    "the transaction of the batch was rolled back by SQLite"
+                )
+            await self.conn.commit()
+        except Exception as error:
+            try:
+                await self.conn.rollback()
+            except Exception:
+                logger.exception("group commit rollback failed")
+            outcomes = [(future, None, error) for future, _, _ in outcomes]
+
+        for future, result, error in outcomes:
+            if future.done():
+                continue
+            if error:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+def _aborts_transaction(result: Any) -> bool:
+    """
+    Whether a write failed with an error SQLite may answer by rolling back the whole
+    transaction (disk full, I/O error, lock timeout...), not only the statement.
+
+    `in_transaction` alone cannot tell: the next write of the batch would silently
+    begin a new transaction after the rollback.
+    """
+    return isinstance(result, sqlite3.DatabaseError) and not isinstance(
+        result, (sqlite3.IntegrityError, sqlite3.ProgrammingError, sqlite3.DataError)
+    )
+
+
+def _fail(batch: list, error: BaseException) -> None:
+    """Report an error to every caller of the batch still waiting."""
+    for *_, future in batch:
+        if not future.done():
+            future.set_exception(error)
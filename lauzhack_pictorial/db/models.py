@@ -1,7 +1,15 @@
-from pydantic import BaseModel
+from dataclasses import dataclass
 
 
-class User(BaseModel):
+# The models are read models hydrated straight from database rows, which are already
+# trusted. They are plain slotted dataclasses rather than pydantic models so that
+# building thousands of them skips validation entirely; pydantic is kept for the DTOs
+# validating untrusted client input. Field order matches the column order of the
+# queries in queries.sql, so a row tuple can be unpacked positionally: `User(*row)`.
+
+
+@dataclass(slots=True)
+class User:
     """
     Represents a user within the application.
 
@@ -11,7 +19,7 @@ class User(BaseModel):
     Attributes:
         id (int): The unique identifier for the user, typically the primary key in the database.
         email (str): The user's email address. It's used for identification purposes and should be unique.
-        password (str): The hashed password of the user. Never store plaintext passwords for security reasons.
+        password (str | int): The hashed password of the user. Never store plaintext passwords for security reasons.
 
     Note:
         In a real application, the password should be securely hashed and the hash should be stored,
@@ -20,10 +28,11 @@ class User(BaseModel):
 
     id: int
     email: str
-    password: str
+    password: str | int
 
 
-class Generation(BaseModel):
+@dataclass(slots=True)
+class Generation:
     """
     Represents an instance of content generated by a user.
 
@@ -42,3 +51,21 @@ class Generation(BaseModel):
     user_id: int
     image_id: str
     prompt: str
+
+
+@dataclass(slots=True)
+class Batch:
+    """
+    A batch generation registered by a user, waiting for its stream to run it.
+
+    Attributes:
+        id (str): The unguessable identifier of the batch, part of its stream URL.
+        user_id (int): The ID of the user who requested the batch.
+        size (str): The size of the images to generate.
+        prompts (list[str]): The prompt of every image of the batch, variants included.
+    """
+
+    id: str
+    user_id: int
+    size: str
+    prompts: list[str]
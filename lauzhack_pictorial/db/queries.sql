@@ -1,7 +1,9 @@
 -- name: get_users
 -- Get all the users in the database
 select
-    *
+    id,
+    email,
+    password
 from
     users;
 
@@ -15,7 +17,9 @@ values
 -- name: get_user_by_credentials^
 -- Verify login credentials and return user
 select
-    *
+    id,
+    email,
+    password
 from
     users
 where
@@ -25,7 +29,9 @@ where
 -- name: get_user_by_id^
 -- Get a user by id
 select
-    *
+    id,
+    email,
+    password
 from
     users
 where
@@ -38,11 +44,103 @@ insert into
 values
     (:user_id, :image_id, :prompt);
 
+-- name: create_generations*!
+-- Create several generations at once
+insert into
+    generations (user_id, image_id, prompt)
+values
+    (:user_id, :image_id, :prompt);
+
 -- name: get_user_generations
 -- Get all generations for a user
 select
-    *
+    id,
+    user_id,
+    image_id,
+    prompt
+from
+    generations
+where
+    user_id = :user_id;
+
+-- name: get_user_generations_page
+-- Get the next page of a user's generations in id order, after the generation :after
+select
+    id,
+    user_id,
+    image_id,
+    prompt
+from
+    generations
+where
+    user_id = :user_id
+    and id > :after
+order by
+    id
+limit
+    :limit;
+
+-- name: get_user_generation_by_image_id^
+-- Get the generation of an image, if it belongs to the user
+select
+    id,
+    user_id,
+    image_id,
+    prompt
 from
     generations
 where
-    user_id = :user_id;
\ No newline at end of file
+    image_id = :image_id
+    and user_id = :user_id;
+
+-- name: search_user_generations
+-- Full-text search through a user's generation prompts, most recent first.
+-- :words are the words longer than the indexed prefixes, as a JSON list: the
+-- match only checks their first characters, prompt_has_prefixes (a Python function
+-- registered by `connect`, which folds case and accents as FTS5 does) the rest.
+select
+    generations.id,
+    generations.user_id,
+    generations.image_id,
+    generations.prompt
+from
+    generations_fts
+    join generations on generations.id = generations_fts.rowid
+where
+    generations_fts match :query
+    and generations.user_id = :user_id
+    and prompt_has_prefixes(generations.prompt, :words)
+order by
+    generations_fts.rowid desc
+limit
+    :limit
+offset
+    :offset;
+
+-- name: create_batch!
+-- Register a batch generation, run later by the request streaming it
+insert into
+    batches (id, user_id, size, prompts, created_at)
+values
+    (:id, :user_id, :size, :prompts, :created_at);
+
+-- name: claim_batch^
+-- Take a user's batch registered since :since: it is deleted, so it runs only once
+delete from
+    batches
+where
+    id = :id
+    and user_id = :user_id
+    and created_at >= :since
+returning
+    id,
+    user_id,
+    size,
+    prompts;
+
+-- name: delete_expired_batches!
+-- Delete the batches registered before :before, whose stream was never opened
+delete from
+    batches
+where
+    created_at < :before;
@@ -1,4 +1,9 @@
-from pydantic import BaseModel
+from typing import Annotated, Literal
+
+from pydantic import BaseModel, Field, model_validator
+
+# Maximum number of images a single batch generation may request.
+MAX_BATCH_IMAGES = 8
 
 
 class CreateUserDto(BaseModel):
@@ -35,10 +40,31 @@ class GenerateImageDto(BaseModel):
     Attributes:
         prompt (str): The textual description or prompt based on which an image
                       will be generated.
+        variants (str): Additional prompts, one per line, generated in the same batch.
+        count (int): Number of images to generate for each prompt, between 1 and 4.
+        size (str): Size of the generated images, as supported by DALL-E 3.
 
     Usage:
         - Utilize this DTO to validate and transfer data for image generation
           requests in the application.
+        - Use `prompts()` to get the list of prompts of a batch, one per image.
     """
 
     prompt: str
+    variants: str = ""
+    count: Annotated[int, Field(ge=1, le=4)] = 1
+    size: Literal["1024x1024", "1792x1024", "1024x1792"] = "1024x1024"
+
+    def prompts(self) -> list[str]:
+        """Return the prompt of every image of the batch, variants included."""
+        prompts = [self.prompt] + [
+            line.strip() for line in self.variants.splitlines() if line.strip()
+        ]
+        return [prompt for prompt in prompts for _ in range(self.count)]
+
+    @model_validator(mode="after")
+    def check_batch_size(self) -> "GenerateImageDto":
+        """Reject batches requesting more than MAX_BATCH_IMAGES images."""
+        if len(self.prompts()) > MAX_BATCH_IMAGES:
+            raise ValueError(f"A batch is limited to {MAX_BATCH_IMAGES} images")
+        return self
@@ -0,0 +1,272 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import re
+import sys
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+from uuid import uuid4
+
+from litestar.logging.config import LoggingConfig
+from litestar.types import ASGIApp, Message, Receive, Scope, Send
+
+# The request being processed by the current task, set by RequestLoggingMiddleware.
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+request_path: ContextVar[Optional[str]] = ContextVar("request_path", default=None)
+request_sampled: ContextVar[bool] = ContextVar("request_sampled", default=True)
+
+# Attributes every LogRecord has: anything else was passed with `extra=`.
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+# Incoming request IDs are reused only when they look like one.
+_REQUEST_ID_PATTERN = re.compile(r"[A-Za-z0-9._-]{1,64}")
+
+
+def _longest_prefix(mapping: dict, path: str):
+    """Return the value of the longest key of `mapping` that `path` starts with, if any."""
+    matches = [prefix for prefix in mapping if path.startswith(prefix)]
+    return mapping[max(matches, key=len)] if matches else None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats a record as a single JSON object per line.
+
+    Besides the time, level, logger and message, the object holds the request ID and
+    path of the request that emitted the record, and every field passed with `extra=`:
+    `logger.info("search", extra={"results": 12})`.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(
+            (key, value)
+            for key, value in vars(record).items()
+            if key not in _RECORD_ATTRIBUTES and value is not None
+        )
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RequestFilter(logging.Filter):
+    """
+    Tags records with the current request and applies the per-route log levels.
+
+    Records emitted while a request is processed get its ID and path. They are kept if
+    their level reaches the level configured for the longest matching path prefix
+    (`default_level` otherwise), and, below WARNING, only if the request was sampled
+    by RequestLoggingMiddleware. Warnings and errors are never sampled out.
+
+    Args:
+        levels (dict[str, str]): Log level per path prefix, e.g. {'/static': 'WARNING'}.
+        default_level (str): Log level of the other paths and of records emitted
+                             outside of a request.
+    """
+
+    def __init__(self, levels: dict[str, str], default_level: str):
+        super().__init__()
+        self.levels = {
+            prefix: logging.getLevelName(level) for prefix, level in levels.items()
+        }
+        self.default_level = logging.getLevelName(default_level)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        path = request_path.get()
+        if path is None:
+            return record.levelno >= self.default_level
+
+        record.request_id = request_id.get()
+        record.path = path
+        level = _longest_prefix(self.levels, path)
+        if record.levelno < (self.default_level if level is None else level):
+            return False
+        return record.levelno >= logging.WARNING or request_sampled.get()
+
+
+class StructuredQueueHandler(QueueHandler):
+    """
+    A logging handler that never blocks the event loop.
+
+    Records are filtered by RequestFilter and put on a bounded queue. A background
+    thread formats them as JSON lines and writes them to the stream. When the queue is
+    full, because the stream cannot keep up, records are dropped and counted instead
+    of slowing down the requests.
+
+    Args:
+        levels (dict[str, str]): Log level per path prefix, see RequestFilter.
+        default_level (str): Log level of the other paths.
+        max_queue (int): Records waiting to be written before new ones are dropped.
+        stream: Where the JSON lines are written. Defaults to the standard output.
+    """
+
+    def __init__(
+        self,
+        levels: Optional[dict[str, str]] = None,
+        default_level: str = "INFO",
+        max_queue: int = 10_000,
+        stream=None,
+    ):
+        super().__init__(queue.Queue(max_queue))
+        self.dropped = 0
+        self.addFilter(RequestFilter(dict(levels or {}), default_level))
+
+        writer = logging.StreamHandler(stream or sys.stdout)
+        writer.setFormatter(JsonFormatter())
+        self.listener = QueueListener(self.queue, writer)
+        self.listener.start()
+        atexit.register(self.listener.stop)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting is left to the writer thread. Only the message is rendered here,
+        # since its arguments may be modified once the handler returns.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _log_server_errors(logger: logging.Logger, scope: Scope, _: list[str]) -> None:
+    """Log the exceptions answered with a 5xx. Client errors show in the access log."""
+    exc = sys.exc_info()[1]
+    if getattr(exc, "status_code", 500) >= 500:
+        logger.error("exception raised on %s", scope["path"], exc_info=exc)
+
+
+def logging_config(
+    level: str = "INFO", levels: Optional[dict[str, str]] = None
+) -> LoggingConfig:
+    """
+    The Litestar logging configuration shared by the applications.
+
+    Every logger, Litestar's included, writes JSON lines through a single
+    StructuredQueueHandler. Server errors are always logged with their traceback.
+
+    Args:
+        level (str): Log level of the routes without a level of their own.
+        levels (dict[str, str]): Log level per path prefix, e.g. {'/static': 'WARNING'}.
+
+    Returns:
+        LoggingConfig: The configuration to pass to the Litestar application.
+    """
+    levels = levels or {}
+    # The loggers must let through the most verbose level any route asks for.
+    lowest = min(logging.getLevelName(name) for name in [level, *levels.values()])
+    return LoggingConfig(
+        handlers={
+            "queue_listener": {
+                "()": "lauzhack_pictorial.logs.StructuredQueueHandler",
+                "levels": levels,
+                "default_level": level,
+            },
+        },
+        root={"handlers": ["queue_listener"], "level": logging.getLevelName(lowest)},
+        loggers={
+            "litestar": {
+                "handlers": ["queue_listener"],
+                "level": "INFO",
+                "propagate": False,
+            },
+        },
+        log_exceptions="always",
+        exception_logging_handler=_log_server_errors,
+    )
+
+
+class RequestLoggingMiddleware:
+    """
+    ASGI middleware giving every request an ID and logging one line per request.
+
+    The ID is taken from the incoming `X-Request-ID` header when there is a valid one
+    (so that IDs assigned by a proxy carry over), generated otherwise, and sent back in
+    the `X-Request-ID` response header. Every record logged while the request is
+    processed carries it.
+
+    Hot routes can be sampled: a request to a path matching a prefix of
+    `sample_rates` is logged (access line and debug/info records alike) with the given
+    probability, decided once per request so that its records are kept or dropped
+    together.
+
+    Usage:
+        ```
+        app = Litestar(
+            middleware=[
+                DefineMiddleware(RequestLoggingMiddleware, sample_rates={"/health": 0.01}),
+            ],
+            logging_config=logging_config(),
+        )
+        ```
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        sample_rates: Optional[dict[str, float]] = None,
+        logger_name: str = "requests",
+    ):
+        self.app = app
+        self.sample_rates = sample_rates or {}
+        self.logger = logging.getLogger(logger_name)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")
+        rid = incoming if _REQUEST_ID_PATTERN.fullmatch(incoming) else uuid4().hex
+        path = scope["path"]
+        rate = _longest_prefix(self.sample_rates, path)
+        tokens = (
+            request_id.set(rid),
+            request_path.set(path),
+            request_sampled.set(rate is None or random.random() < rate),
+        )
+        status = None
+
+        async def send_with_request_id(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-request-id", rid.encode()),
+                ]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            self.logger.info(
+                "%s %s %s",
+                scope["method"],
+                path,
+                status,
+                extra={
+                    "method": scope["method"],
+                    "status": status,
+                    "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+                },
+            )
+            for var, token in zip((request_id, request_path, request_sampled), tokens):
+                var.reset(token)
@@ -5,6 +5,7 @@ from litestar.middleware import (
 )
 
 from .db import Repository
+from .sessions import verify_session
 
 
 class CookieAuthenticationMiddleware(AbstractAuthenticationMiddleware):
@@ -42,9 +43,9 @@ class CookieAuthenticationMiddleware(AbstractAuthenticationMiddleware):
         """
         Coroutine that checks for a user's session cookie and attempts to authenticate them.
 
-        It retrieves a 'pictorial-session' cookie from the incoming connection, uses
-        it to look up the user in the database, and constructs an AuthenticationResult
-        accordingly.
+        It retrieves a 'pictorial-session' cookie from the incoming connection, checks
+        its signature, uses it to look up the user in the database, and constructs an
+        AuthenticationResult accordingly.
 
         Parameters:
             connection (ASGIConnection): The connection object for the incoming request.
@@ -54,8 +55,11 @@ class CookieAuthenticationMiddleware(AbstractAuthenticationMiddleware):
                                   a user object if authentication was successful, and
                                   an auth type (in this case, 'cookie').
         """
-        # Retrieve the session ID from the 'pictorial-session' cookie.
-        id = connection.cookies.get("pictorial-session")
+        # Retrieve the signed session from the 'pictorial-session' cookie.
+        session = connection.cookies.get("pictorial-session")
+
+        # Verify the signature; a tampered or unsigned cookie yields no user ID.
+        id = verify_session(session) if session else None
 
         # Access the application state to get the repository for database operations.
         repository: Repository = connection.app.state.repository
@@ -0,0 +1,265 @@
+import asyncio
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+
+import openai
+
+
+class UpstreamUnavailable(Exception):
+    """Raised when an upstream call is rejected by the circuit breaker or gave up."""
+
+
+# Errors hinting at an unhealthy upstream: they are retried and count towards the
+# circuit breaker. Other errors (e.g. a prompt rejected by the content policy) are
+# the caller's problem and are raised straight away.
+RETRYABLE_ERRORS = (
+    asyncio.TimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+@dataclass
+class UpstreamMetrics:
+    """
+    Counters and recent latencies of the calls made through a ResilientCaller.
+
+    Attributes:
+        calls (int): Calls made by the application.
+        successes (int): Calls that eventually returned a result.
+        failures (int): Calls that eventually failed, for whatever reason.
+        attempts (int): Requests sent upstream, including retries and hedges.
+        retries (int): Attempts made after a failed one.
+        timeouts (int): Attempts that exceeded their latency budget.
+        hedges (int): Second requests sent because the first one was too slow.
+        hedge_wins (int): Hedged requests that answered before the original one.
+        rejected (int): Calls failed fast because the circuit breaker was open.
+        latencies (deque): Latencies of the last successful attempts, in seconds.
+    """
+
+    calls: int = 0
+    successes: int = 0
+    failures: int = 0
+    attempts: int = 0
+    retries: int = 0
+    timeouts: int = 0
+    hedges: int = 0
+    hedge_wins: int = 0
+    rejected: int = 0
+    latencies: deque = field(default_factory=lambda: deque(maxlen=200))
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Return the q-th percentile (0-100) of the recent latencies, if any."""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+    def snapshot(self) -> dict:
+        """Return the metrics as a JSON-serializable dictionary."""
+        counters = {k: v for k, v in vars(self).items() if k != "latencies"}
+        return {
+            **counters,
+            "latency_p50": self.percentile(50),
+            "latency_p95": self.percentile(95),
+        }
+
+
+@dataclass
+class CircuitBreaker:
+    """
+    Fails fast when the upstream looks unhealthy.
+
+    The breaker is 'closed' while calls succeed. After `failure_threshold`
+    consecutive failures it 'opens' and rejects every call for `reset_timeout`
+    seconds. It then turns 'half_open' and lets a single probe call through: a
+    success closes it again, a failure reopens it. A probe that ends without an
+    answer, e.g. cancelled, reopens it without waiting, for the next call to probe.
+
+    Args:
+        failure_threshold (int): Consecutive failures needed to open the breaker.
+        reset_timeout (float): Seconds to stay open before probing the upstream.
+    """
+
+    failure_threshold: int = 5
+    reset_timeout: float = 30.0
+
+    state: str = "closed"
+    failures: int = 0
+    opened_at: float = 0.0
+
+    def allow(self) -> bool:
+        """Tell whether a call may go upstream right now."""
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            # Let this call through as the probe; others are rejected meanwhile.
+            self.state = "half_open"
+            return True
+        return self.state == "closed"
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def abandon(self) -> None:
+        """
+        Settle a call that ended without telling whether the upstream is healthy, e.g.
+        cancelled: a half-open breaker reopens, and the next call is the new probe.
+        """
+        if self.state == "half_open":
+            self.state = "open"
+
+
+@dataclass
+class ResilientCaller:
+    """
+    Wraps calls to an upstream API with timeouts, retries, hedging and a circuit breaker.
+
+    Every call gets an overall latency `budget`. Each attempt is bounded by
+    `attempt_timeout` and by what is left of the budget. Retryable errors are
+    retried up to `max_retries` times after a random ("full jitter") exponential
+    backoff, as long as the budget allows it. With `hedge` enabled, a second
+    identical request is sent when the first one is slower than the recent p95
+    latency, and whichever answers first wins.
+
+    Args:
+        budget (float): Maximum total time, in seconds, spent on a call.
+        attempt_timeout (float): Maximum time, in seconds, of a single attempt.
+        max_retries (int): Number of retries after the first attempt.
+        backoff (float): Base delay, in seconds, of the exponential backoff.
+        hedge (bool): Whether to send a hedged request after the p95 latency.
+        hedge_min_samples (int): Latencies needed before the p95 is trusted.
+        breaker (CircuitBreaker): The circuit breaker guarding the upstream.
+        metrics (UpstreamMetrics): The metrics updated by every call.
+
+    Usage:
+        ```
+        caller = ResilientCaller(budget=60)
+        res = await caller.call(client.images.generate, prompt="...")
+        ```
+    """
+
+    budget: float = 90.0
+    attempt_timeout: float = 60.0
+    max_retries: int = 2
+    backoff: float = 0.5
+    hedge: bool = False
+    hedge_min_samples: int = 20
+    breaker: CircuitBreaker = field(default_factory=CircuitBreaker)
+    metrics: UpstreamMetrics = field(default_factory=UpstreamMetrics)
+
+    async def call(self, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Call `fn(*args, **kwargs)` with the resilience policies applied.
+
+        Raises:
+            UpstreamUnavailable: If the breaker is open, or if every attempt failed
+                                 with a retryable error or the budget ran out.
+            Exception: Any non-retryable error raised by `fn`.
+        """
+        self.metrics.calls += 1
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.budget
+
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                self.metrics.rejected += 1
+                self.metrics.failures += 1
+                raise UpstreamUnavailable("circuit breaker is open")
+
+            if attempt:
+                self.metrics.retries += 1
+
+            remaining = deadline - loop.time()
+            try:
+                result = await self._attempt(fn, args, kwargs, remaining)
+            except RETRYABLE_ERRORS as error:
+                self.breaker.record_failure()
+                last_error = error
+            except Exception:
+                # The upstream answered, it is the request that was refused.
+                self.breaker.record_success()
+                self.metrics.failures += 1
+                raise
+            except BaseException:
+                # Cancelled: a half-open breaker must not wait for this probe forever.
+                self.breaker.abandon()
+                self.metrics.failures += 1
+                raise
+            else:
+                self.breaker.record_success()
+                self.metrics.successes += 1
+                return result
+
+            # Full jitter: sleep a random time up to the exponential backoff.
+            delay = random.uniform(0, self.backoff * 2**attempt)
+            if loop.time() + delay >= deadline:
+                break
+            await asyncio.sleep(delay)
+
+        self.metrics.failures += 1
+        raise UpstreamUnavailable("upstream call failed") from last_error
+
+    async def _attempt(self, fn, args, kwargs, remaining: float) -> Any:
+        timeout = min(self.attempt_timeout, remaining)
+        if timeout <= 0:
+            self.metrics.timeouts += 1
+            raise asyncio.TimeoutError()
+
+        hedge_after = None
+        if self.hedge and len(self.metrics.latencies) >= self.hedge_min_samples:
+            hedge_after = self.metrics.percentile(95)
+
+        if hedge_after is None or hedge_after >= timeout:
+            return await self._timed(fn, args, kwargs, timeout)
+        return await self._hedged(fn, args, kwargs, timeout, hedge_after)
+
+    async def _timed(self, fn, args, kwargs, timeout: float) -> Any:
+        self.metrics.attempts += 1
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(fn(*args, **kwargs), timeout)
+        except asyncio.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        self.metrics.latencies.append(time.perf_counter() - start)
+        return result
+
+    async def _hedged(self, fn, args, kwargs, timeout: float, hedge_after: float):
+        primary = asyncio.create_task(self._timed(fn, args, kwargs, timeout))
+        done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+        if done:
+            return primary.result()
+
+        # The original request is slower than usual: race it against a second one.
+        self.metrics.hedges += 1
+        hedged = asyncio.create_task(
+            self._timed(fn, args, kwargs, timeout - hedge_after)
+        )
+        pending = {primary, hedged}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedged:
+                            self.metrics.hedge_wins += 1
+                        return task.result()
+            # Both failed: report the original request's error.
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
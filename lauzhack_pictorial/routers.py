@@ -1,24 +1,101 @@
-import base64
-from pathlib import Path
-from typing import Annotated, Optional
+import asyncio
+import logging
+import os
+from typing import Annotated, AsyncGenerator, Optional
+from urllib.parse import urlencode
 from uuid import uuid4
 
-import aiofiles
 from litestar import Controller, Request, Router, get, post
 from litestar.datastructures import Cookie, State
 from litestar.enums import RequestEncodingType
 from litestar.exceptions import HTTPException
-from litestar.params import Body
-from litestar.response import Redirect, Template
-from litestar.status_codes import HTTP_401_UNAUTHORIZED
+from litestar.params import Body, Parameter
+from litestar.response import Redirect, Stream, Template
+from litestar.status_codes import (
+    HTTP_401_UNAUTHORIZED,
+    HTTP_404_NOT_FOUND,
+    HTTP_503_SERVICE_UNAVAILABLE,
+)
 from openai import AsyncClient
 
+from .admission import AdmissionControl, RouteLimit
+from .config import CONFIG
 from .db.models import User
 from .dtos import CreateUserDto, GenerateImageDto
+from .export import export_library
+from .resilience import ResilientCaller, UpstreamUnavailable
+from .sessions import sign_session
+from .storage import ImageStorage, decode_base64
 from .state import AppState
 
-# Initialize an asynchronous client for the OpenAI API.
-openai_client = AsyncClient()
+logger = logging.getLogger(__name__)
+
+# Initialize an asynchronous client for the OpenAI API. Its own retries are disabled:
+# timeouts, retries, hedging and circuit breaking are handled by the caller below.
+openai_client = AsyncClient(max_retries=0)
+
+# Apply the resilience policies to every call made to the OpenAI API.
+openai_caller = ResilientCaller(
+    budget=CONFIG.OPENAI_BUDGET_SECONDS, hedge=CONFIG.OPENAI_HEDGE
+)
+
+# Admission policies of the expensive routes, enforced by the AdmissionControlMiddleware.
+# A user may fire the 3 prompts of the generate page at once, then 1 image every 5s.
+admission = AdmissionControl(
+    [
+        RouteLimit(
+            method="POST",
+            path="/generate/image",
+            user_rate=0.2,
+            user_burst=3,
+            global_rate=5,
+            global_burst=20,
+            max_concurrency=16,
+            max_queue=32,
+            queue_timeout=10,
+        ),
+        # A batch fans out to up to 8 images: 1 batch every 30s per user.
+        RouteLimit(
+            method="POST",
+            path="/generate/batch",
+            user_rate=1 / 30,
+            user_burst=1,
+            global_rate=1,
+            global_burst=5,
+            max_concurrency=16,
+            max_queue=16,
+            queue_timeout=10,
+        ),
+        # Only a registered batch can be streamed, once: bound how many run at once.
+        RouteLimit(
+            method="GET",
+            path="/generate/batch/stream",
+            user_rate=1,
+            user_burst=2,
+            global_rate=5,
+            global_burst=10,
+            max_concurrency=8,
+            max_queue=8,
+            queue_timeout=10,
+        ),
+        # An export streams the whole library: 1 every 10 minutes per user, and only
+        # a few at a time, they hold a connection for as long as the download lasts.
+        RouteLimit(
+            method="GET",
+            path="/library/export",
+            user_rate=1 / 600,
+            user_burst=2,
+            global_rate=1,
+            global_burst=5,
+            max_concurrency=4,
+            max_queue=4,
+            queue_timeout=10,
+        ),
+    ]
+)
+
+# Maximum number of OpenAI calls a single batch runs at the same time.
+BATCH_CONCURRENCY = 4
 
 
 class MainController(Controller):
@@ -99,7 +176,7 @@ class MainController(Controller):
 
         redirect_response = Redirect("/")
         redirect_response.cookies.append(
-            Cookie(key="pictorial-session", value=user.id, httponly=True)
+            Cookie(key="pictorial-session", value=sign_session(user.id), httponly=True)
         )
         return redirect_response
 
@@ -144,29 +221,33 @@ class MainController(Controller):
 main_router = Router(path="/", route_handlers=[MainController])
 
 
-async def save_image(b64_string: str) -> (str, str):
+async def save_image(storage: ImageStorage, b64_string: str) -> (str, str):
     """
-    Saves the base64-encoded image as a PNG file to the local filesystem.
+    Saves the base64-encoded image as a PNG in the configured image storage.
 
     Args:
+        storage (ImageStorage): The backend storing the images.
         b64_string (str): The base64-encoded string of the image data.
 
     Returns:
-        Tuple[str, str]: A tuple containing the unique identifier for the image and the file path.
+        Tuple[str, str]: A tuple containing the unique identifier for the image and its URL.
     """
-    # Decode the base64 image string to binary data.
-    image_data = base64.b64decode(b64_string)
-
-    # Create a unique filename using UUID and construct the file path in the 'static' directory.
+    # Create a unique identifier for the image using UUID.
     name = str(uuid4())
-    path = Path("static") / f"{name}.png"
 
-    # Write the image data to a file asynchronously.
-    async with aiofiles.open(path, "wb") as file:
-        await file.write(image_data)
+    # Decode the base64 image string chunk by chunk, streaming it to the storage.
+    await storage.save(name, decode_base64(b64_string))
+
+    # Return the image ID and the URL the browser can load it from.
+    return name, image_url(name)
+
 
-    # Return the image ID and the file path.
-    return name, str(path)
+def image_url(image_id: str) -> str:
+    """
+    The URL of a stored image, redirected to the storage by `ImagesController` for
+    the user owning the image only.
+    """
+    return f"/images/{image_id}"
 
 
 class GenerateController(Controller):
@@ -218,17 +299,24 @@ class GenerateController(Controller):
             Template: Renders the page displaying the generated image and relevant information.
         """
         # Generate an image using the OpenAI API based on the supplied prompt.
-        res = await openai_client.images.generate(
-            model="dall-e-3",
-            prompt=data.prompt,
-            n=1,
-            size="1024x1024",
-            response_format="b64_json",
-        )
+        try:
+            res = await openai_caller.call(
+                openai_client.images.generate,
+                model="dall-e-3",
+                prompt=data.prompt,
+                n=1,
+                size=data.size,
+                response_format="b64_json",
+            )
+        except UpstreamUnavailable:
+            raise HTTPException(
+                detail="Image generation is unavailable, try again later",
+                status_code=HTTP_503_SERVICE_UNAVAILABLE,
+            )
 
         # Save the generated image using the helper function.
         b64_string = res.data[0].b64_json
-        img_id, img_path = await save_image(b64_string)
+        img_id, img_url = await save_image(state.storage, b64_string)
 
         # Persist the generation metadata in the database.
         await state.repository.create_generation(request.user.id, img_id, data.prompt)
@@ -236,14 +324,177 @@ class GenerateController(Controller):
         # Render the generated image output.
         return Template(
             template_name="generate/generate-image-output.html",
-            context={"prompt": data.prompt, "url": f"/{img_path}"},
+            context={"prompt": data.prompt, "url": img_url},
+        )
+
+    @post("batch")
+    async def generate_batch(
+        self,
+        request: Request[Optional[User], str, State],
+        state: AppState,
+        data: Annotated[
+            GenerateImageDto, Body(media_type=RequestEncodingType.URL_ENCODED)
+        ],
+    ) -> Template:
+        """
+        Starts a batch generation of several images or prompt variants.
+
+        The form is validated and the batch registered for the user here. It runs in
+        `stream_batch`: this handler renders the output area, which opens a
+        server-sent events connection to the batch to receive each image as soon as
+        it is ready.
+
+        Args:
+            request (Request): The HTTP request object containing user and state data.
+            state (AppState): The shared state containing the repository for database operations.
+            data (GenerateImageDto): DTO carrying the prompts, count and size of the batch.
+
+        Returns:
+            Template: The batch output area connected to the event stream.
+        """
+        prompts = data.prompts()
+        batch_id = await state.repository.create_batch(
+            request.user.id, data.size, prompts
+        )
+        return Template(
+            template_name="generate/batch-output.html",
+            context={
+                "total": len(prompts),
+                "stream_url": f"/generate/batch/stream?{urlencode({'batch': batch_id})}",
+            },
         )
 
+    @get("batch/stream")
+    async def stream_batch(
+        self,
+        request: Request[Optional[User], str, State],
+        state: AppState,
+        batch_id: Annotated[str, Parameter(query="batch", max_length=64)],
+    ) -> Stream:
+        """
+        Generates a registered batch of images and streams each one as a server-sent event.
+
+        The batch is claimed first: it only runs once, for the user who registered
+        it, so reloading or replaying the stream URL cannot generate (and pay for) it
+        again. The OpenAI calls run concurrently, at most BATCH_CONCURRENCY at a time.
+        Each image is saved to the library as soon as it arrives and sent to the
+        browser as an 'image' event. Once all are done, a final 'done' event closes
+        the stream.
+
+        The batch runs in a task of its own: if the browser disconnects, the images
+        already paid for are still saved to the library.
+
+        Args:
+            request (Request): The HTTP request object containing user and state data.
+            state (AppState): The shared state containing the repository for database operations.
+            batch_id (str): The ID of the batch, as registered by `generate_batch`.
+
+        Returns:
+            Stream: A 'text/event-stream' response of rendered image fragments.
+
+        Raises:
+            HTTPException: 404 if the batch does not exist, belongs to another user,
+                           expired or already ran.
+        """
+        claimed = await state.repository.claim_batch(request.user.id, batch_id)
+        if claimed is None:
+            raise HTTPException(
+                detail="Unknown or already started batch",
+                status_code=HTTP_404_NOT_FOUND,
+            )
+        prompts = claimed.prompts
+        finished: asyncio.Queue = asyncio.Queue()
+
+        batch = asyncio.create_task(
+            run_batch(request.user.id, prompts, claimed.size, state, finished)
+        )
+
+        templates = request.app.template_engine
+        image_template = templates.get_template("generate/batch-image.html")
+        done_template = templates.get_template("generate/batch-done.html")
+
+        async def events() -> AsyncGenerator[str, None]:
+            # Ask the browser not to reconnect for a day should the stream drop.
+            yield "retry: 86400000\n\n"
+            for _ in prompts:
+                prompt, url, error = await finished.get()
+                html = image_template.render(prompt=prompt, url=url, error=error)
+                yield format_sse("image", html)
+            saved = await batch
+            yield format_sse(
+                "done", done_template.render(saved=saved, total=len(prompts))
+            )
+
+        return Stream(
+            events(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache"},
+        )
+
+
+def format_sse(event: str, data: str) -> str:
+    """Format a server-sent event, splitting multi-line data into several data fields."""
+    lines = "".join(f"data: {line}\n" for line in data.splitlines())
+    return f"event: {event}\n{lines}\n"
+
+
+async def run_batch(
+    user_id: int,
+    prompts: list[str],
+    size: str,
+    state: AppState,
+    finished: asyncio.Queue,
+) -> int:
+    """
+    Generates one image per prompt with a bounded concurrent fan-out, saving each one.
+
+    Every image is added to the user's library as soon as it is stored, so that its
+    URL serves it, and is then put on the `finished` queue as a `(prompt, url, error)`
+    tuple. Errors are put on the queue as well. The concurrent inserts of a batch
+    still share commits through the group-commit writer.
+
+    Returns:
+        int: The number of images generated and saved to the library.
+    """
+    slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def generate(prompt: str) -> bool:
+        try:
+            async with slots:
+                res = await openai_caller.call(
+                    openai_client.images.generate,
+                    model="dall-e-3",
+                    prompt=prompt,
+                    n=1,
+                    size=size,
+                    response_format="b64_json",
+                )
+            # Saved right away, concurrently with the other images of the batch.
+            img_id, img_url = await save_image(state.storage, res.data[0].b64_json)
+            await state.repository.create_generation(user_id, img_id, prompt)
+        except UpstreamUnavailable:
+            await finished.put((prompt, None, "image generation is unavailable"))
+            return False
+        except Exception:
+            # The details (upstream URLs, error bodies) are for the logs only.
+            logger.exception("batch image failed", extra={"user_id": user_id})
+            await finished.put((prompt, None, "the image could not be generated"))
+            return False
+
+        await finished.put((prompt, img_url, None))
+        return True
+
+    return sum(await asyncio.gather(*(generate(prompt) for prompt in prompts)))
+
 
 # The router that handles requests coming to the '/generate' endpoint
 generate_router = Router(path="/generate", route_handlers=[GenerateController])
 
 
+# Number of search results rendered per page in the library.
+SEARCH_PAGE_SIZE = 24
+
+
 class LibraryRouter(Controller):
     """
     The LibraryRouter manages routes related to the user's library of generated items.
@@ -278,15 +529,214 @@ class LibraryRouter(Controller):
         # Retrieve the list of generated content for the current user.
         generations = await state.repository.get_user_generations(request.user.id)
 
-        # Output the user generations to the console (useful for debugging purposes).
-        print(generations)
+        # Log the size of the library rather than its content (useful for debugging purposes).
+        logger.debug("library viewed", extra={"generations": len(generations)})
 
         # Render the library template, passing the necessary context.
         return Template(
             template_name="library/index.html",
-            context={"user": request.user, "generations": generations},
+            context={
+                "user": request.user,
+                "generations": generations,
+                "image_url": image_url,
+            },
+        )
+
+    @get("/search")
+    async def search(
+        self,
+        request: Request[Optional[User], str, State],
+        state: AppState,
+        q: str = "",
+        offset: int = 0,
+    ) -> Template:
+        """
+        Renders the library results matching a full-text search on the prompts.
+
+        Called by the htmx search box of the library page as the user types. The
+        results come most recent first and are paginated: when more matches exist, the
+        fragment ends with a "Load more" button fetching the next page.
+
+        Args:
+            request (Request): The HTTP request object containing user and state data.
+            state (AppState): The shared state containing the repository for database operations.
+            q (str): The search text; an empty search lists the whole library.
+            offset (int): The number of results to skip, used for pagination.
+
+        Returns:
+            Template: The library results fragment.
+        """
+        # An empty search box restores the full library.
+        if not q.strip():
+            generations = await state.repository.get_user_generations(request.user.id)
+            return Template(
+                template_name="library/results.html",
+                context={
+                    "generations": generations,
+                    "image_url": image_url,
+                },
+            )
+
+        # Fetch one extra row to know whether there is a next page.
+        generations = await state.repository.search_user_generations(
+            request.user.id, q, limit=SEARCH_PAGE_SIZE + 1, offset=offset
+        )
+        has_more = len(generations) > SEARCH_PAGE_SIZE
+
+        return Template(
+            template_name="library/results.html",
+            context={
+                "generations": generations[:SEARCH_PAGE_SIZE],
+                "image_url": image_url,
+                "q": q,
+                "next_offset": offset + SEARCH_PAGE_SIZE if has_more else None,
+            },
+        )
+
+    @get("/export")
+    async def export(
+        self, request: Request[Optional[User], str, State], state: AppState
+    ) -> Stream:
+        """
+        Downloads the user's library as a ZIP archive of the images and their prompts.
+
+        The archive is built on the fly while it is sent: memory stays constant
+        whatever the size of the library, and the download starts right away.
+
+        Args:
+            request (Request): The HTTP request object containing user and state data.
+            state (AppState): The shared state containing the repository and image storage.
+
+        Returns:
+            Stream: An 'application/zip' response downloaded as an attachment.
+        """
+        return Stream(
+            export_library(state.repository, state.storage, request.user.id),
+            media_type="application/zip",
+            headers={
+                "Content-Disposition": 'attachment; filename="pictorial-library.zip"',
+                "Cache-Control": "no-store",
+            },
         )
 
 
 # The Router handles requests directed at '/library' and delegates them to the LibraryRouter.
 library_router = Router(path="/library", route_handlers=[LibraryRouter])
+
+
+class HealthController(Controller):
+    """
+    The HealthController exposes liveness and readiness probes for the worker that
+    serves the request. Each worker process answers on its own, so the process ID is
+    included to tell workers apart behind a load balancer.
+    """
+
+    path = "/"
+
+    @get("/health")
+    async def health(self) -> dict:
+        """
+        Liveness probe: the worker's event loop is running and accepting requests.
+
+        Returns:
+            dict: The status and the process ID of the worker.
+        """
+        return {"status": "ok", "pid": os.getpid()}
+
+    @get("/ready")
+    async def ready(self, state: AppState) -> dict:
+        """
+        Readiness probe: the worker can reach the database.
+
+        Args:
+            state (AppState): The shared state containing the repository for database operations.
+
+        Returns:
+            dict: The status and the process ID of the worker.
+
+        Raises:
+            HTTPException: With a 503 status code if the database is not reachable.
+        """
+        if not await state.repository.ping():
+            raise HTTPException(
+                detail="Database unavailable", status_code=HTTP_503_SERVICE_UNAVAILABLE
+            )
+        return {"status": "ready", "pid": os.getpid()}
+
+    @get("/metrics")
+    async def metrics(self) -> dict:
+        """
+        Exposes the metrics of the worker's calls to the OpenAI API and of its admission control.
+
+        Returns:
+            dict: The OpenAI call counters, recent latency percentiles and circuit breaker
+                  state, and the admitted, queued and shed counters of each protected route.
+        """
+        return {
+            "openai": {
+                **openai_caller.metrics.snapshot(),
+                "breaker": openai_caller.breaker.state,
+            },
+            "admission": admission.snapshot(),
+        }
+
+
+# The Router exposing the health endpoints at the root of the application.
+health_router = Router(path="/", route_handlers=[HealthController])
+
+
+class ImagesController(Controller):
+    """
+    The ImagesController gives every stored image a stable URL. It redirects to the
+    storage's own URL (a presigned URL for object stores), so the image bytes are served
+    by the storage rather than by the Python workers.
+    """
+
+    path = "/"
+
+    @get("/{image_id:str}")
+    async def image(
+        self,
+        request: Request[Optional[User], str, State],
+        image_id: str,
+        state: AppState,
+    ) -> Redirect:
+        """
+        Redirects to the URL of one of the user's images in the storage.
+
+        The redirect can be cached by the browser for as long as the storage's URL
+        stays valid, and the storage hands out the same URL for an image within that
+        time: showing an image again costs neither a request to the workers nor a new
+        download.
+
+        Args:
+            request (Request): The HTTP request object containing user and state data.
+            image_id (str): The image ID of a generation.
+            state (AppState): The shared state containing the repository and the image storage.
+
+        Returns:
+            Redirect: A temporary redirect to the image.
+
+        Raises:
+            HTTPException: 404 if the image is not one of the user's generations.
+        """
+        generation = None
+        if request.user is not None:
+            generation = await state.repository.get_user_generation_by_image_id(
+                request.user.id, image_id
+            )
+        if generation is None:
+            raise HTTPException(
+                detail="Image not found", status_code=HTTP_404_NOT_FOUND
+            )
+
+        return Redirect(
+            state.storage.url(image_id),
+            headers={
+                "Cache-Control": f"private, max-age={state.storage.url_max_age()}"
+            },
+        )
+
+
+# The Router redirecting '/images/<image_id>' to the stored images.
+images_router = Router(path="/images", route_handlers=[ImagesController])
@@ -0,0 +1,51 @@
+import hashlib
+import hmac
+from typing import Optional
+
+from .config import CONFIG
+
+
+def _signature(user_id: str) -> str:
+    """Compute the hex HMAC-SHA256 signature of a user ID with the shared secret."""
+    return hmac.new(
+        CONFIG.SECRET_KEY.encode(), user_id.encode(), hashlib.sha256
+    ).hexdigest()
+
+
+def sign_session(user_id: int) -> str:
+    """
+    Builds the value of the 'pictorial-session' cookie for a user.
+
+    The cookie carries the user ID together with an HMAC signature derived from
+    the SECRET_KEY setting. Because every worker process reads the same secret
+    from the environment, a cookie issued by one worker can be validated by any
+    other worker without sharing memory or hitting the database.
+
+    Args:
+        user_id (int): The ID of the authenticated user.
+
+    Returns:
+        str: The signed session value, formatted as '<user_id>.<signature>'.
+    """
+    return f"{user_id}.{_signature(str(user_id))}"
+
+
+def verify_session(value: str) -> Optional[int]:
+    """
+    Validates a 'pictorial-session' cookie value and extracts the user ID.
+
+    Args:
+        value (str): The raw cookie value, as produced by `sign_session`.
+
+    Returns:
+        Optional[int]: The user ID if the signature is valid, otherwise None.
+    """
+    user_id, _, signature = value.partition(".")
+    if not user_id.isdigit() or not signature:
+        return None
+
+    # Use a constant-time comparison to avoid leaking the signature through timing.
+    if not hmac.compare_digest(signature, _signature(user_id)):
+        return None
+
+    return int(user_id)
@@ -3,6 +3,7 @@ from typing import Optional
 from litestar.datastructures import State
 
 from lauzhack_pictorial.db import Repository
+from lauzhack_pictorial.storage import ImageStorage
 
 
 class AppState(State):
@@ -20,6 +21,8 @@ class AppState(State):
                                            operations. Having it as an optional
                                            attribute allows for lazy loading or
                                            conditional initialization.
+        storage (ImageStorage, optional): The backend storing the generated images.
     """
 
     repository: Optional[Repository]
+    storage: Optional[ImageStorage]
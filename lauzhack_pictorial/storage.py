@@ -0,0 +1,337 @@
+import base64
+import hashlib
+import hmac
+import time
+import xml.etree.ElementTree as ET
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import AsyncGenerator, AsyncIterable, AsyncIterator, Optional
+from urllib.parse import quote, urlsplit
+
+import aiofiles
+import httpx
+from litestar import Litestar
+
+from .config import CONFIG
+
+# Size of the chunks images are read, decoded and uploaded in.
+CHUNK_SIZE = 256 * 1024
+
+
+class ImageStorage(ABC):
+    """
+    Where the generated images are stored and how browsers get them.
+
+    Images are identified by their image ID (the `image_id` of a generation) and
+    written as a stream of chunks, so that a backend never needs the whole file
+    in memory.
+    """
+
+    @abstractmethod
+    async def save(self, image_id: str, chunks: AsyncIterable[bytes]) -> None:
+        """Store the PNG image `image_id` from a stream of byte chunks."""
+
+    @abstractmethod
+    def read(self, image_id: str) -> AsyncIterator[bytes]:
+        """Stream the bytes of the PNG image `image_id`, chunk by chunk."""
+
+    @abstractmethod
+    def url(self, image_id: str) -> str:
+        """Return a URL browsers can fetch the image from, without going through Python."""
+
+    @abstractmethod
+    def url_max_age(self) -> int:
+        """Seconds the URL returned by `url` right now stays valid, to cache it for."""
+
+
+class LocalStorage(ImageStorage):
+    """
+    Stores images as PNG files in a local directory served as static files.
+
+    Only suited to a single machine: every worker must see the same directory.
+
+    Args:
+        directory (Path): The directory the images are written to.
+        url_prefix (str): The URL path the directory is served under.
+    """
+
+    def __init__(self, directory: Path = Path("static"), url_prefix: str = "/static"):
+        self.directory = directory
+        self.url_prefix = url_prefix
+
+    def path(self, image_id: str) -> Path:
+        return self.directory / f"{image_id}.png"
+
+    async def save(self, image_id: str, chunks: AsyncIterable[bytes]) -> None:
+        async with aiofiles.open(self.path(image_id), "wb") as file:
+            async for chunk in chunks:
+                await file.write(chunk)
+
+    async def read(self, image_id: str) -> AsyncIterator[bytes]:
+        async with aiofiles.open(self.path(image_id), "rb") as file:
+            while chunk := await file.read(CHUNK_SIZE):
+                yield chunk
+
+    def url(self, image_id: str) -> str:
+        return f"{self.url_prefix}/{image_id}.png"
+
+    def url_max_age(self) -> int:
+        # Images never change once saved, and their URL never expires.
+        return 86400
+
+
+class S3Storage(ImageStorage):
+    """
+    Stores images in an S3-compatible object store (AWS S3, MinIO, ...).
+
+    Requests are signed with AWS Signature Version 4 and sent over a pooled HTTP
+    client shared by the worker. Uploads are streamed: an image fitting in a single
+    part is sent with one PUT, larger ones with a multipart upload whose parts are
+    sent as soon as they are filled. Browsers download the images straight from the
+    object store through presigned URLs.
+
+    Presigned URLs are signed as of the start of the current window of half their
+    validity, not as of now. Within a window, every request (and every worker) gets
+    the very same URL for an image, valid for at least half of `presign_expires`, so
+    browsers can cache the image instead of downloading it again under a new URL.
+
+    Args:
+        client (httpx.AsyncClient): The pooled HTTP client used for every request.
+        endpoint_url (str): Base URL of the object store, e.g. 'http://localhost:9000'.
+        bucket (str): The bucket the images are stored in (path-style addressing).
+        access_key (str): The access key ID.
+        secret_key (str): The secret access key.
+        region (str): The region the requests are signed for.
+        presign_expires (int): Validity of the presigned URLs, in seconds.
+        part_size (int): Size of the multipart upload parts, at least 5 MiB.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        endpoint_url: str,
+        bucket: str,
+        access_key: str,
+        secret_key: str,
+        region: str = "us-east-1",
+        presign_expires: int = 3600,
+        part_size: int = 8 * 1024 * 1024,
+    ):
+        self.client = client
+        self.endpoint_url = endpoint_url.rstrip("/")
+        self.host = urlsplit(self.endpoint_url).netloc
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.presign_expires = presign_expires
+        self.part_size = part_size
+
+    def _key_path(self, image_id: str) -> str:
+        return f"/{self.bucket}/{quote(image_id)}.png"
+
+    def _signing_key(self, date: str) -> bytes:
+        key = f"AWS4{self.secret_key}".encode()
+        for message in (date, self.region, "s3", "aws4_request"):
+            key = hmac.new(key, message.encode(), hashlib.sha256).digest()
+        return key
+
+    def _signature(self, now: datetime, canonical_request: str) -> str:
+        date = now.strftime("%Y%m%d")
+        string_to_sign = "\n".join(
+            [
+                "AWS4-HMAC-SHA256",
+                now.strftime("%Y%m%dT%H%M%SZ"),
+                f"{date}/{self.region}/s3/aws4_request",
+                hashlib.sha256(canonical_request.encode()).hexdigest(),
+            ]
+        )
+        return hmac.new(
+            self._signing_key(date), string_to_sign.encode(), hashlib.sha256
+        ).hexdigest()
+
+    @staticmethod
+    def _canonical_query(params: dict) -> str:
+        return "&".join(
+            f"{quote(k, safe='-_.~')}={quote(str(v), safe='-_.~')}"
+            for k, v in sorted(params.items())
+        )
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[dict] = None,
+        content: bytes = b"",
+    ) -> httpx.Response:
+        """Send a request signed with SigV4 in the Authorization header."""
+        params = params or {}
+        now = datetime.now(timezone.utc)
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        payload_hash = hashlib.sha256(content).hexdigest()
+        headers = {
+            "host": self.host,
+            "x-amz-content-sha256": payload_hash,
+            "x-amz-date": amz_date,
+        }
+        signed_headers = ";".join(sorted(headers))
+        canonical_request = "\n".join(
+            [
+                method,
+                path,
+                self._canonical_query(params),
+                "".join(f"{k}:{headers[k]}\n" for k in sorted(headers)),
+                signed_headers,
+                payload_hash,
+            ]
+        )
+        scope = f"{now.strftime('%Y%m%d')}/{self.region}/s3/aws4_request"
+        headers["authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={self.access_key}/{scope}, "
+            f"SignedHeaders={signed_headers}, "
+            f"Signature={self._signature(now, canonical_request)}"
+        )
+
+        query = self._canonical_query(params)
+        url = f"{self.endpoint_url}{path}" + (f"?{query}" if query else "")
+        response = await self.client.request(
+            method, url, headers=headers, content=content
+        )
+        response.raise_for_status()
+        return response
+
+    async def save(self, image_id: str, chunks: AsyncIterable[bytes]) -> None:
+        path = self._key_path(image_id)
+        buffer = bytearray()
+        upload_id = None
+        parts = []
+
+        try:
+            async for chunk in chunks:
+                buffer += chunk
+                if len(buffer) < self.part_size:
+                    continue
+
+                # The image does not fit in a single part: switch to a multipart upload.
+                if upload_id is None:
+                    response = await self._request("POST", path, {"uploads": ""})
+                    upload_id = ET.fromstring(response.content).findtext("{*}UploadId")
+                part, buffer = bytes(buffer[: self.part_size]), buffer[self.part_size :]
+                parts.append(await self._upload_part(path, upload_id, parts, part))
+
+            if upload_id is None:
+                await self._request("PUT", path, content=bytes(buffer))
+                return
+
+            if buffer:
+                parts.append(
+                    await self._upload_part(path, upload_id, parts, bytes(buffer))
+                )
+            await self._request(
+                "POST", path, {"uploadId": upload_id}, self._complete_body(parts)
+            )
+        except BaseException:
+            # Do not leave the uploaded parts behind, they are billed by the store.
+            if upload_id is not None:
+                await self._request("DELETE", path, {"uploadId": upload_id})
+            raise
+
+    async def _upload_part(
+        self, path: str, upload_id: str, parts: list, content: bytes
+    ) -> str:
+        params = {"partNumber": len(parts) + 1, "uploadId": upload_id}
+        response = await self._request("PUT", path, params, content)
+        return response.headers["etag"]
+
+    @staticmethod
+    def _complete_body(etags: list[str]) -> bytes:
+        parts = "".join(
+            f"<Part><PartNumber>{n}</PartNumber><ETag>{etag}</ETag></Part>"
+            for n, etag in enumerate(etags, start=1)
+        )
+        return f"<CompleteMultipartUpload>{parts}</CompleteMultipartUpload>".encode()
+
+    async def read(self, image_id: str) -> AsyncIterator[bytes]:
+        async with self.client.stream("GET", self.url(image_id)) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                yield chunk
+
+    def _signed_at(self) -> datetime:
+        """The start of the current signing window, half the URL validity long."""
+        window = max(1, self.presign_expires // 2)
+        now = int(time.time())
+        return datetime.fromtimestamp(now - now % window, timezone.utc)
+
+    def url(self, image_id: str) -> str:
+        """Return a presigned GET URL, valid for at least half of `presign_expires`."""
+        now = self._signed_at()
+        path = self._key_path(image_id)
+        params = {
+            "X-Amz-Algorithm": "AWS4-HMAC-SHA256",
+            "X-Amz-Credential": f"{self.access_key}/{now.strftime('%Y%m%d')}/"
+            f"{self.region}/s3/aws4_request",
+            "X-Amz-Date": now.strftime("%Y%m%dT%H%M%SZ"),
+            "X-Amz-Expires": self.presign_expires,
+            "X-Amz-SignedHeaders": "host",
+        }
+        canonical_request = "\n".join(
+            [
+                "GET",
+                path,
+                self._canonical_query(params),
+                f"host:{self.host}\n",
+                "host",
+                "UNSIGNED-PAYLOAD",
+            ]
+        )
+        params["X-Amz-Signature"] = self._signature(now, canonical_request)
+        return f"{self.endpoint_url}{path}?{self._canonical_query(params)}"
+
+    def url_max_age(self) -> int:
+        expires = self._signed_at().timestamp() + self.presign_expires
+        return max(0, int(expires - time.time()))
+
+
+async def decode_base64(b64_string: str) -> AsyncIterator[bytes]:
+    """Decode a base64 string as a stream of chunks instead of one large buffer."""
+    # Base64 decodes 4 characters into 3 bytes: keep the chunks aligned on 4.
+    step = CHUNK_SIZE // 3 * 4
+    for start in range(0, len(b64_string), step):
+        yield base64.b64decode(b64_string[start : start + step])
+
+
+@asynccontextmanager
+async def storage_provider(app: Litestar) -> AsyncGenerator[None, None]:
+    """
+    An asynchronous context manager setting the image storage in the application state.
+
+    The backend is chosen by the STORAGE_BACKEND setting: 'local' writes to the
+    'static' directory, 's3' uses the S3-compatible object store configured by the
+    S3_* settings, through an HTTP connection pool closed on shutdown.
+
+    Args:
+        app (Litestar): An instance of the Litestar application.
+
+    Yields:
+        None: While yielding, the application has access to the storage.
+    """
+    if CONFIG.STORAGE_BACKEND != "s3":
+        app.state.storage = LocalStorage()
+        yield
+        return
+
+    limits = httpx.Limits(max_connections=64, max_keepalive_connections=16)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        app.state.storage = S3Storage(
+            client,
+            endpoint_url=CONFIG.S3_ENDPOINT_URL,
+            bucket=CONFIG.S3_BUCKET,
+            access_key=CONFIG.S3_ACCESS_KEY,
+            secret_key=CONFIG.S3_SECRET_KEY,
+            region=CONFIG.S3_REGION,
+            presign_expires=CONFIG.S3_PRESIGN_EXPIRES,
+        )
+        yield
@@ -0,0 +1,59 @@
+import os
+import sqlite3
+from pathlib import Path
+from typing import Callable, Iterator
+
+import pytest
+from litestar.testing import TestClient
+
+# Settings required to import the application modules, before any test does.
+os.environ.setdefault("DATABASE_URL", "db/db.sqlite3")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+MIGRATIONS = Path(__file__).parent.parent / "db" / "migrations"
+
+
+@pytest.fixture
+def database(tmp_path) -> Path:
+    """An SQLite database with the 'up' part of every dbmate migration applied."""
+    path = tmp_path / "db" / "db.sqlite3"
+    path.parent.mkdir()
+    conn = sqlite3.connect(path)
+    for migration in sorted(MIGRATIONS.glob("*.sql")):
+        up = migration.read_text().split("-- migrate:up")[1]
+        conn.executescript(up.split("-- migrate:down")[0])
+    conn.executescript(
+        "insert into users (email, password) values ('a@example.com', 1);"
+        "insert into users (email, password) values ('b@example.com', 2);"
+    )
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def client(database, tmp_path, monkeypatch) -> Iterator[TestClient]:
+    """
+    A client of the application, run from a directory holding `database` where it
+    expects the database (db/db.sqlite3) and the local image storage (static).
+    """
+    from lauzhack_pictorial.app import app
+    from lauzhack_pictorial.routers import admission
+
+    # Fresh admission buckets, whatever the previous tests requested.
+    monkeypatch.setattr(admission, "_states", {})
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "static").mkdir()
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def login(client) -> Callable[[int], None]:
+    """Authenticate the next requests of `client` as a user."""
+    from lauzhack_pictorial.sessions import sign_session
+
+    def login(user_id: int) -> None:
+        client.cookies.set("pictorial-session", sign_session(user_id))
+
+    return login
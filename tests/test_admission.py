@@ -0,0 +1,142 @@
+import asyncio
+
+from lauzhack_pictorial.admission import (
+    AdmissionControl,
+    AdmissionControlMiddleware,
+    RouteAdmission,
+    RouteLimit,
+)
+
+
+def limit(**overrides) -> RouteLimit:
+    options = dict(
+        method="POST",
+        path="/expensive",
+        user_rate=0.001,
+        user_burst=2,
+        global_rate=0.001,
+        global_burst=100,
+        max_concurrency=1,
+        max_queue=0,
+        queue_timeout=1,
+    )
+    return RouteLimit(**{**options, **overrides})
+
+
+class App:
+    """An ASGI app answering 200, or holding its requests until released."""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def __call__(self, scope, receive, send):
+        await self.release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def request(middleware, client: str = "203.0.113.7", forwarded=None) -> int:
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/expensive",
+        "headers": headers,
+        "client": (client, 1234),
+    }
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    await middleware(scope, None, send)
+    return messages[0]["status"]
+
+
+def test_user_tokens_are_refunded_when_the_global_bucket_rejects():
+    async def main():
+        admission = AdmissionControl([limit(global_burst=1)])
+        middleware = AdmissionControlMiddleware(App(), admission)
+        statuses = [await request(middleware) for _ in range(3)]
+        route = admission.route("POST", "/expensive")
+        return statuses, route.user_buckets["client:203.0.113.7"].tokens
+
+    statuses, tokens = asyncio.run(main())
+    assert statuses == [200, 503, 503]
+    assert round(tokens) == 1
+
+
+def test_tokens_are_refunded_when_the_queue_is_full():
+    async def main():
+        admission = AdmissionControl([limit()])
+        app = App()
+        app.release.clear()
+        middleware = AdmissionControlMiddleware(app, admission)
+        busy = asyncio.create_task(request(middleware, client="198.51.100.1"))
+        await asyncio.sleep(0)
+        shed = await request(middleware)
+        app.release.set()
+        await busy
+
+        route = admission.route("POST", "/expensive")
+        user_tokens = route.user_buckets["client:203.0.113.7"].tokens
+        return shed, user_tokens, route.global_bucket.tokens
+
+    shed, user_tokens, global_tokens = asyncio.run(main())
+    assert shed == 503
+    assert round(user_tokens) == 2
+    assert round(global_tokens) == 99
+
+
+def test_clients_behind_a_trusted_proxy_have_their_own_bucket():
+    async def main():
+        admission = AdmissionControl([limit()])
+        middleware = AdmissionControlMiddleware(
+            App(), admission, trusted_proxies=["10.0.0.0/8"]
+        )
+        statuses = []
+        for client in ("198.51.100.1", "198.51.100.2"):
+            for _ in range(2):
+                statuses.append(
+                    await request(
+                        middleware, client="10.0.0.5", forwarded=f"{client}, 10.0.0.9"
+                    )
+                )
+        # An address prepended by the client itself is not trusted.
+        statuses.append(
+            await request(
+                middleware, client="10.0.0.5", forwarded="192.0.2.1, 198.51.100.1"
+            )
+        )
+        return statuses, set(admission.route("POST", "/expensive").user_buckets)
+
+    statuses, keys = asyncio.run(main())
+    assert statuses == [200, 200, 200, 200, 429]
+    assert keys == {"client:198.51.100.1", "client:198.51.100.2"}
+
+
+def test_forwarded_header_of_an_untrusted_client_is_ignored():
+    async def main():
+        admission = AdmissionControl([limit()])
+        middleware = AdmissionControlMiddleware(App(), admission)
+        statuses = [
+            await request(middleware, forwarded=f"192.0.2.{i}") for i in range(3)
+        ]
+        return statuses, set(admission.route("POST", "/expensive").user_buckets)
+
+    statuses, keys = asyncio.run(main())
+    assert statuses == [200, 200, 429]
+    assert keys == {"client:203.0.113.7"}
+
+
+def test_tracked_users_are_bounded_even_when_none_is_idle(monkeypatch):
+    monkeypatch.setattr(RouteAdmission, "MAX_TRACKED_USERS", 3)
+    route = RouteAdmission(limit())
+    for user in ("a", "b", "c"):
+        route.user_bucket(user).take()
+    # Seen again: "b" is now the least recently seen user.
+    route.user_bucket("a")
+
+    route.user_bucket("d").take()
+    assert list(route.user_buckets) == ["c", "a", "d"]
@@ -0,0 +1,117 @@
+import asyncio
+import base64
+import html
+import re
+from types import SimpleNamespace
+
+import pytest
+
+from lauzhack_pictorial import db, routers
+from lauzhack_pictorial.db import GroupCommitter, Repository, connect, queries
+from lauzhack_pictorial.db.models import Batch
+
+
+async def repository(path) -> Repository:
+    conn = await connect(str(path))
+    writer = GroupCommitter(conn)
+    writer.start()
+    return Repository(conn, queries, writer)
+
+
+async def close(repository: Repository) -> None:
+    await repository.writer.stop()
+    await repository.conn.close()
+
+
+def test_batch_is_claimed_once_by_its_user(database):
+    async def main():
+        repo = await repository(database)
+        batch_id = await repo.create_batch(1, "1024x1024", ["a cat", "a cat"])
+        claims = [
+            await repo.claim_batch(2, batch_id),
+            await repo.claim_batch(1, batch_id),
+            await repo.claim_batch(1, batch_id),
+        ]
+        await close(repo)
+        return batch_id, claims
+
+    batch_id, claims = asyncio.run(main())
+    assert claims == [
+        None,
+        Batch(batch_id, 1, "1024x1024", ["a cat", "a cat"]),
+        None,
+    ]
+
+
+def test_expired_batch_cannot_be_claimed(database, monkeypatch):
+    async def main():
+        repo = await repository(database)
+        monkeypatch.setattr(db, "BATCH_TTL_SECONDS", -1)
+        batch_id = await repo.create_batch(1, "1024x1024", ["a cat"])
+        claim = await repo.claim_batch(1, batch_id)
+        # Registering another batch deletes the expired ones.
+        await repo.create_batch(1, "1024x1024", ["a dog"])
+        [(count,)] = await repo.conn.execute_fetchall("select count(*) from batches")
+        await close(repo)
+        return claim, count
+
+    claim, count = asyncio.run(main())
+    assert claim is None
+    assert count == 1
+
+
+class Images:
+    """A stand-in for `openai_client.images`, failing on the prompts in `failures`."""
+
+    def __init__(self, failures: dict[str, Exception]):
+        self.failures = failures
+        self.prompts = []
+
+    async def generate(self, prompt: str, **_) -> SimpleNamespace:
+        self.prompts.append(prompt)
+        if prompt in self.failures:
+            raise self.failures[prompt]
+        image = SimpleNamespace(b64_json=base64.b64encode(b"png").decode())
+        return SimpleNamespace(data=[image])
+
+
+@pytest.fixture
+def images(monkeypatch) -> Images:
+    images = Images({"a dog": RuntimeError("https://internal.example/v1 said no")})
+    monkeypatch.setattr(routers.openai_client, "images", images)
+    return images
+
+
+def stream_url(client, prompt: str, variants: str = "") -> str:
+    """Register a batch through the form, returning the URL of its stream."""
+    response = client.post(
+        "/generate/batch", data={"prompt": prompt, "variants": variants}
+    )
+    assert response.status_code == 200
+    (url,) = re.findall(r'sse-connect="([^"]+)"', response.text)
+    return html.unescape(url)
+
+
+def test_registered_batch_streams_once_for_its_user(client, login, images):
+    login(1)
+    url = stream_url(client, "a cat")
+
+    login(2)
+    assert client.get(url).status_code == 404
+
+    login(1)
+    stream = client.get(url)
+    assert stream.status_code == 200
+    assert "event: image" in stream.text and "event: done" in stream.text
+    assert client.get(url).status_code == 404
+    assert images.prompts == ["a cat"]
+    assert client.get("/library").text.count('src="/images/') == 1
+
+
+def test_batch_errors_are_not_shown_to_the_user(client, login, images):
+    login(1)
+    stream = client.get(stream_url(client, "a cat", variants="a dog"))
+
+    assert "the image could not be generated" in stream.text
+    assert "internal.example" not in stream.text
+    assert "1 of 2 images saved" in stream.text
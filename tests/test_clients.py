@@ -0,0 +1,19 @@
+from htmx_tutorial.clients import ClientTable
+
+
+def test_codes_stay_within_vocabularies_smaller_than_requested():
+    # Faker knows fewer than 1000 countries
+    table = ClientTable(size=2000, first_names=20, countries=1000, seed=0)
+    assert len(table.countries) < 1000
+
+    for facet in table.facets.values():
+        assert facet.codes.max() < len(facet.labels)
+    assert table.first.max() < len(table.first_names)
+    assert table.name_code.max() < len(table.full_names)
+
+    country = table.countries[-1]
+    result = table.search(selected={"country": [country]}, sort="name")
+    (values,) = (values for facet, values in result.facets if facet.name == "country")
+    counts = {value.label: value.count for value in values}
+    assert counts[country] == result.total
+    assert all(client.country == country for client in result.clients)
@@ -0,0 +1,142 @@
+import asyncio
+import sqlite3
+
+import aiosqlite
+import pytest
+
+from lauzhack_pictorial.db.group_commit import GroupCommitter
+
+
+async def insert(conn: aiosqlite.Connection, value: int) -> int:
+    cursor = await conn.execute("insert into items (value) values (?)", (value,))
+    return cursor.lastrowid
+
+
+async def connect(path) -> aiosqlite.Connection:
+    conn = await aiosqlite.connect(path)
+    await conn.execute("create table if not exists items (value int unique)")
+    await conn.commit()
+    return conn
+
+
+def committed(path) -> list[int]:
+    with sqlite3.connect(path) as conn:
+        return [value for (value,) in conn.execute("select value from items")]
+
+
+def test_batch_is_committed_and_acknowledged(tmp_path):
+    async def main():
+        conn = await connect(tmp_path / "db")
+        committer = GroupCommitter(conn)
+        committer.start()
+        results = await asyncio.gather(
+            *(committer.submit(insert, value) for value in range(10)),
+            committer.submit(insert, 0),
+            return_exceptions=True,
+        )
+        await committer.stop()
+        await conn.close()
+        return results
+
+    results = asyncio.run(main())
+    # A constraint violation only fails its own write.
+    assert results[:10] == list(range(1, 11))
+    assert isinstance(results[10], sqlite3.IntegrityError)
+    assert sorted(committed(tmp_path / "db")) == list(range(10))
+
+
+def test_submit_requires_a_running_committer(tmp_path):
+    async def main():
+        conn = await connect(tmp_path / "db")
+        committer = GroupCommitter(conn)
+        with pytest.raises(RuntimeError):
+            await committer.submit(insert, 1)
+        committer.start()
+        await committer.submit(insert, 2)
+        await committer.stop()
+        with pytest.raises(RuntimeError):
+            await committer.submit(insert, 3)
+        await conn.close()
+
+    asyncio.run(main())
+    assert committed(tmp_path / "db") == [2]
+
+
+def test_failed_commit_and_rollback_fail_the_batch_only(tmp_path, monkeypatch):
+    async def main():
+        conn = await connect(tmp_path / "db")
+        committer = GroupCommitter(conn)
+        committer.start()
+
+        commit, rollback = conn.commit, conn.rollback
+
+        async def failing():
+            raise sqlite3.OperationalError("disk I/O error")
+
+        monkeypatch.setattr(conn, "commit", failing)
+        monkeypatch.setattr(conn, "rollback", failing)
+        results = await asyncio.gather(
+            committer.submit(insert, 1),
+            committer.submit(insert, 2),
+            return_exceptions=True,
+        )
+        monkeypatch.setattr(conn, "commit", commit)
+        monkeypatch.setattr(conn, "rollback", rollback)
+        await rollback()
+
+        # The committer survived the failure.
+        assert committer.running
+        await committer.submit(insert, 3)
+        await committer.stop()
+        await conn.close()
+        return results
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, sqlite3.OperationalError) for result in results)
+    assert committed(tmp_path / "db") == [3]
+
+
+def test_transaction_rolled_back_by_sqlite_is_not_acknowledged(tmp_path):
+    async def rolled_back(conn: aiosqlite.Connection) -> None:
+        # What SQLite does by itself on a full disk or an I/O error.
+        await conn.rollback()
+
+    async def io_error(conn: aiosqlite.Connection) -> None:
+        raise sqlite3.OperationalError("disk I/O error")
+
+    async def main():
+        conn = await connect(tmp_path / "db")
+        committer = GroupCommitter(conn)
+        committer.start()
+        results = []
+        for failure in (rolled_back, io_error):
+            results += await asyncio.gather(
+                committer.submit(insert, len(results)),
+                committer.submit(failure),
+                return_exceptions=True,
+            )
+        await committer.stop()
+        await conn.close()
+        return results
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, sqlite3.Error) for result in results)
+    assert committed(tmp_path / "db") == []
+
+
+def test_cancelled_committer_fails_pending_writes(tmp_path):
+    async def main():
+        conn = await connect(tmp_path / "db")
+        committer = GroupCommitter(conn, window=10)
+        committer.start()
+        pending = asyncio.ensure_future(committer.submit(insert, 1))
+        await asyncio.sleep(0.01)
+        committer._task.cancel()
+        with pytest.raises(RuntimeError):
+            await pending
+        assert not committer.running
+        with pytest.raises(RuntimeError):
+            await committer.submit(insert, 2)
+        await conn.close()
+
+    asyncio.run(main())
@@ -0,0 +1,34 @@
+import sqlite3
+
+
+def store(database, user_id: int, image_id: str) -> None:
+    """Add an image to the library of a user, in the database and the storage."""
+    with sqlite3.connect(database) as conn:
+        conn.execute(
+            "insert into generations (user_id, image_id, prompt) values (?, ?, ?)",
+            (user_id, image_id, "a red fox"),
+        )
+    (database.parent.parent / "static" / f"{image_id}.png").write_bytes(b"png")
+
+
+def test_library_links_images_through_the_owner_check(client, login, database):
+    store(database, 1, "fox")
+    login(1)
+
+    page = client.get("/library")
+    assert 'src="/images/fox"' in page.text
+
+    image = client.get("/images/fox", follow_redirects=False)
+    assert image.status_code == 302
+    assert image.headers["location"] == "/static/fox.png"
+    assert image.headers["cache-control"].startswith("private, max-age=")
+
+
+def test_images_of_other_users_are_not_found(client, login, database):
+    store(database, 1, "fox")
+    assert client.get("/images/fox", follow_redirects=False).status_code == 404
+
+    login(2)
+    for image_id in ("fox", "missing"):
+        response = client.get(f"/images/{image_id}", follow_redirects=False)
+        assert response.status_code == 404
@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+
+from htmx_tutorial import live_data_router
+from htmx_tutorial.live_data_router import LiveDataController
+from htmx_tutorial.market import MarketEngine
+
+
+def test_cursor_of_another_engine_is_not_accepted():
+    market = MarketEngine(size=100, seed=0)
+    market.advance(market.updated + 10 * market.tick_seconds)
+    assert market.parse_cursor(market.cursor(4)) == 4
+    assert market.parse_cursor(market.cursor(market.tick)) == market.tick
+
+    # After a restart: the ticks of the new engine start over
+    restarted = MarketEngine(size=100, seed=0)
+    for cursor in (market.cursor(0), market.cursor(market.tick)):
+        assert restarted.parse_cursor(cursor) is None
+    # Ahead of the engine, or not a cursor at all
+    for cursor in (market.cursor(market.tick + 1), "10", f"{market.epoch}:x"):
+        assert market.parse_cursor(cursor) is None
+
+
+@pytest.mark.parametrize("since", [None, "stale", "ahead"])
+def test_unknown_cursor_gets_the_whole_table(monkeypatch, since):
+    market = MarketEngine(size=100, tick_seconds=3600, seed=0)
+    monkeypatch.setattr(live_data_router, "market", market)
+    cursor = {
+        "stale": MarketEngine(size=100, seed=0).cursor(5),
+        "ahead": market.cursor(market.tick + 5),
+    }.get(since)
+
+    handler = LiveDataController.get_live_data.fn
+    response = asyncio.run(handler(None, symbols="", count=20, since=cursor))
+    assert response.context["snapshot"]
+    assert len(response.context["quotes"]) == 20
+    assert response.context["cursor"] == market.cursor(market.tick)
+
+
+def test_known_cursor_gets_the_changed_rows(monkeypatch):
+    # No tick elapses during the test: no row changes
+    market = MarketEngine(size=100, tick_seconds=3600, seed=0)
+    monkeypatch.setattr(live_data_router, "market", market)
+    cursor = market.cursor(market.advance())
+
+    handler = LiveDataController.get_live_data.fn
+    response = asyncio.run(handler(None, symbols="", count=20, since=cursor))
+    assert not response.context["snapshot"]
+    assert response.context["quotes"] == []
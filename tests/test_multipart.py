@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+from litestar.exceptions import HTTPException
+
+from htmx_tutorial.form_submission_router import ResizeImageDto
+from htmx_tutorial.multipart import (
+    MAX_HEADERS_SIZE,
+    MAX_PREAMBLE_SIZE,
+    parse_multipart_stream,
+)
+
+
+class Request:
+    """The part of a Litestar request read by the parser, streaming `chunks`."""
+
+    def __init__(self, *chunks: bytes):
+        self.headers = {"content-type": "multipart/form-data; boundary=xyz"}
+        self.chunks = chunks
+
+    async def stream(self):
+        for chunk in self.chunks:
+            yield chunk
+
+
+def part(headers: bytes, value: bytes = b"") -> bytes:
+    return b"--xyz\r\n" + headers + b"\r\n\r\n" + value + b"\r\n"
+
+
+def parse(*chunks: bytes):
+    return asyncio.run(parse_multipart_stream(Request(*chunks), max_file_size=1024))
+
+
+def test_fields_are_parsed_across_chunks():
+    body = part(b'Content-Disposition: form-data; name="size"', b"50") + b"--xyz--"
+    fields, files = parse(*(body[i : i + 3] for i in range(0, len(body), 3)))
+    assert fields == {"size": ["50"]} and files == {}
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b"x" * (MAX_PREAMBLE_SIZE + 1) + b"\r\n" + part(b"") + b"--xyz--",
+        part(b"X-Padding: " + b"x" * MAX_HEADERS_SIZE) + b"--xyz--",
+    ],
+    ids=["preamble", "headers"],
+)
+def test_oversized_preamble_or_headers_are_rejected(body):
+    # Without the limit, the parser would buffer the whole endless stream.
+    endless = [body[:1024]] + [b"x" * 1024] * 10_000
+    for chunks in ([body], endless):
+        with pytest.raises(HTTPException) as error:
+            parse(*chunks)
+        assert error.value.status_code == 400
+        assert "larger than" in error.value.detail
+
+
+def test_invalid_utf8_field_is_rejected():
+    body = part(b'Content-Disposition: form-data; name="size"', b"\xff5") + b"--xyz--"
+    with pytest.raises(HTTPException) as error:
+        parse(body)
+    assert error.value.status_code == 400
+    assert "UTF-8" in error.value.detail
+
+
+def test_repeated_formats_are_rendered_once():
+    data = ResizeImageDto(formats=["webp", "jpeg", "webp", "jpeg"])
+    assert data.formats == ["webp", "jpeg"]
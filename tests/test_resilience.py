@@ -0,0 +1,144 @@
+import asyncio
+
+import pytest
+
+from lauzhack_pictorial import resilience
+from lauzhack_pictorial.resilience import (
+    CircuitBreaker,
+    ResilientCaller,
+    UpstreamUnavailable,
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(resilience.time, "monotonic", clock)
+    return clock
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10)
+    for _ in range(2):
+        breaker.record_failure()
+    breaker.record_success()
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock.now += 9
+    assert not breaker.allow()
+
+
+def test_breaker_lets_a_single_probe_through_after_the_timeout(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()
+
+
+@pytest.mark.parametrize(
+    "settle, state", [("record_success", "closed"), ("record_failure", "open")]
+)
+def test_probe_outcome_closes_or_reopens_the_breaker(clock, settle, state):
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=10)
+    for _ in range(5):
+        breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow()
+
+    getattr(breaker, settle)()
+    assert breaker.state == state
+    assert breaker.allow() == (state == "closed")
+
+
+def test_abandoned_probe_lets_the_next_call_probe(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow()
+
+    breaker.abandon()
+    assert breaker.state == "open"
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+
+
+def opened_caller() -> ResilientCaller:
+    """A caller whose breaker is open, and lets a probe through on the next call."""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    return ResilientCaller(max_retries=0, breaker=breaker)
+
+
+async def refused():
+    raise ValueError("content policy violation")
+
+
+async def timed_out():
+    raise asyncio.TimeoutError()
+
+
+async def answered():
+    return "image"
+
+
+def test_failing_calls_open_the_breaker_and_are_rejected():
+    async def main():
+        caller = ResilientCaller(
+            max_retries=0, breaker=CircuitBreaker(failure_threshold=2)
+        )
+        for _ in range(2):
+            with pytest.raises(UpstreamUnavailable):
+                await caller.call(timed_out)
+        assert caller.breaker.state == "open"
+        with pytest.raises(UpstreamUnavailable, match="open"):
+            await caller.call(answered)
+        return caller
+
+    caller = asyncio.run(main())
+    assert caller.metrics.rejected == 1
+
+
+@pytest.mark.parametrize(
+    "fn, state", [(answered, "closed"), (refused, "closed"), (timed_out, "open")]
+)
+def test_probe_call_settles_the_breaker(fn, state):
+    async def main():
+        caller = opened_caller()
+        try:
+            await caller.call(fn)
+        except (ValueError, UpstreamUnavailable):
+            pass
+        return caller
+
+    assert asyncio.run(main()).breaker.state == state
+
+
+def test_cancelled_probe_call_does_not_leave_the_breaker_half_open():
+    async def main():
+        caller = opened_caller()
+        probe = asyncio.create_task(caller.call(asyncio.sleep, 60))
+        await asyncio.sleep(0.01)
+        assert caller.breaker.state == "half_open"
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        assert caller.breaker.state == "open"
+        assert await caller.call(answered) == "image"
+        assert caller.breaker.state == "closed"
+
+    asyncio.run(main())
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from lauzhack_pictorial.db import Repository, connect, fts_user_query, queries
+
+PROMPTS = [
+    (1, "Éclairs au chocolat"),
+    (1, "A WATERCOLOR of a red fox"),
+    (1, "mid-century modern chair"),
+    (2, "watercolor eclairs"),
+]
+
+
+def test_fts_user_query_quotes_words_and_folds_long_ones():
+    assert fts_user_query(42, "  ") == ("", [])
+    assert fts_user_query(42, 'red "Éclairs') == (
+        'owner:"u42" AND prompt:("red"* """Éclai"*)',
+        ["eclairs"],
+    )
+
+
+@pytest.fixture
+def search(database):
+    """Search the generations of `PROMPTS` as a user, returning the prompts found."""
+
+    async def main(user_id: int, query: str) -> list[str]:
+        conn = await connect(str(database))
+        for owner, prompt in PROMPTS:
+            await queries.create_generation(
+                conn, user_id=owner, image_id=prompt, prompt=prompt
+            )
+        await conn.commit()
+        try:
+            repository = Repository(conn, queries, writer=None)
+            found = await repository.search_user_generations(user_id, query)
+            return [generation.prompt for generation in found]
+        finally:
+            await conn.close()
+
+    return lambda user_id, query: asyncio.run(main(user_id, query))
+
+
+@pytest.mark.parametrize(
+    "query", ["Éclairs", "éclairs", "eclairs", "ECLAIRS", "éclai", "chocolat au"]
+)
+def test_accents_and_case_are_ignored(search, query):
+    assert search(1, query) == ["Éclairs au chocolat"]
+
+
+@pytest.mark.parametrize(
+    "query, found",
+    [
+        ("watercolo", ["A WATERCOLOR of a red fox"]),
+        ("Watercolor fox", ["A WATERCOLOR of a red fox"]),
+        # Long words are checked whole, not only on their indexed prefix
+        ("watercooler", []),
+        ("mid-century", ["mid-century modern chair"]),
+        # A long word must start a word of the prompt
+        ("atercolor", []),
+    ],
+)
+def test_long_words_are_matched_as_prefixes(search, query, found):
+    assert search(1, query) == found
+
+
+def test_other_users_generations_are_not_found(search):
+    assert search(2, "eclairs") == ["watercolor eclairs"]
+    assert search(2, "chocolat") == []
@@ -0,0 +1,26 @@
+from lauzhack_pictorial import storage
+from lauzhack_pictorial.storage import S3Storage
+
+
+def test_presigned_urls_are_reused_within_half_their_validity(monkeypatch):
+    s3 = S3Storage(
+        None,
+        "http://localhost:9000",
+        "pictorial",
+        "key",
+        "secret",
+        presign_expires=3600,
+    )
+    now = 1_800_000_000  # The start of a signing window
+    monkeypatch.setattr(storage.time, "time", lambda: now)
+    url = s3.url("image")
+    assert s3.url_max_age() == 3600
+
+    now += 1799
+    assert s3.url("image") == url
+    assert s3.url_max_age() == 1801
+    assert s3.url("other") != url
+
+    now += 1
+    assert s3.url("image") != url
+    assert s3.url_max_age() == 3600